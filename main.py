@@ -1,10 +1,28 @@
 #!/usr/bin/env python3
 
-from src.assistant import Assistant
+import argparse
+import sys
+from src.cli import add_subcommands, run
 
 def main():
+    parser = argparse.ArgumentParser(description="Personal assistant for contacts and notes. "
+                                     "Without a command, starts the interactive assistant.")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="run the commands of FILE (- for stdin) without prompts and exit")
+    add_subcommands(parser)
+    args = parser.parse_args()
+
+    if args.batch:
+        # Batch mode never loads the interactive interface
+        from src.batch import run_script
+        sys.exit(1 if run_script(args.batch) else 0)
+    if args.subcommand:
+        # Neither do one-shot commands, which load only the book they read
+        sys.exit(run(args))
+
+    from src.assistant import Assistant
     assistant = Assistant()
     assistant.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,114 +1,516 @@
+import re
 from collections import UserDict
-from src.record import ContactRecord
-from src.utils.storage import Storage
+from src.migrations import SCHEMA_VERSION, migrate
+from src.utils import bulk_io
+from src.utils.birthday_index import BirthdayIndex
+from src.utils.ngram_index import NGramIndex
+from src.utils.normalization import search_key
+from src.utils.query import (Condition, Plan, QueryError, check_field, dated_condition, name_condition, prefix_of,
+                             text_match)
+from src.utils.sorted_index import SortedIndex
+from src.utils.validators import normalize_phone
+from src.utils.storage import Storage, DEFAULT_BOOK_BACKEND, DEFAULT_RECORD_FORMAT, BACKGROUND_WRITES, CONTACTS_COMPRESSION
 from datetime import datetime, timedelta
 from io import StringIO
 
+# Queries that can be (part of) a phone number, and are also matched in canonical form
+PHONE_QUERY = re.compile(r'^[\d\s\-\(\)\+]*\d[\d\s\-\(\)\+]*$')
+
+# Queries for everyone with an email at a domain, such as @acme.com
+DOMAIN_QUERY = re.compile(r'^@[\w-]+(\.[\w-]+)+$')
+
+# Fields of contacts in structured queries
+QUERY_FIELDS = {"text", "name", "phone", "email", "address", "birthday", "created", "updated"}
+
+# birthday:MM-DD, birthday:MM-* or with the year, birthday:YYYY-MM-DD
+BIRTHDAY_PATTERN = re.compile(r'^(?:(\d{4})-)?(\d{1,2})-(\d{1,2}|\*)$')
+
+# Fuzzy search: how many contacts it returns and the share of the query's trigrams a contact must hold
+FUZZY_LIMIT = 5
+FUZZY_THRESHOLD = 0.4
+
 class AddressBook(UserDict):
     """Class for storing and managing contacts"""
     def __init__(self):
         super().__init__()
-        self.storage = Storage("address_book.pickle")
+        # Trigram, phone number and birthday indexes, each built from the records on first use
+        self.search_index = None
+        # Casefolded names in sorted order, built from the keys alone
+        self.name_index = None
+        self.phone_index = None
+        self.birthday_index = None
+        # Email local parts ("john@") and reversed domains ("@com.acme.") in sorted order
+        self.email_index = None
+        self.storage = Storage("address_book.pickle", journal=True, backend=DEFAULT_BOOK_BACKEND, kind="contacts",
+                               write_behind=True, record_format=DEFAULT_RECORD_FORMAT,
+                               codec=CONTACTS_COMPRESSION, background=BACKGROUND_WRITES,
+                               schema=SCHEMA_VERSION)
         # Load data from storage if available
         data = self.storage.load()
-        if data:
+        if data is not None:
             self.data = data
-            # Migrate old records if needed
-            self._migrate_records()
-    
-    def _migrate_records(self):
-        """Migrate old Record objects to ContactRecord"""
-        migrated = False
-        for name, record in list(self.data.items()):
-            # Check if record is not a ContactRecord or doesn't have required attributes
-            if not hasattr(record, 'phones') or not hasattr(record, 'emails'):
-                # Create a new ContactRecord
-                new_record = ContactRecord(record.name.value)
-                # Copy any available attributes
-                if hasattr(record, 'birthday'):
-                    new_record.birthday = record.birthday
-                if hasattr(record, 'address'):
-                    new_record.address = record.address
-                if hasattr(record, 'created_at'):
-                    new_record.created_at = record.created_at
-                if hasattr(record, 'updated_at'):
-                    new_record.updated_at = record.updated_at
-                
-                # Replace old record with new one
-                self.data[name] = new_record
-                migrated = True
-        
-        # Save changes if any records were migrated
-        if migrated:
-            self.save()
+            # Upgrade records stamped with an older schema; nothing to scan when it is current
+            schema = self.storage.backend.loaded_schema
+            if schema is not None and migrate(self.data, "contacts", schema):
+                self.save()
     
     def add_record(self, record):
         """Add a new contact record to the address book"""
+        if self._indexes():
+            replaced = self.data.get(record.name.value)
+            if replaced is not None and replaced is not record:
+                self._unindex_record(replaced)
+            self._index_record(record)
+        self._index_name(record.name.value)
         self.data[record.name.value] = record
-        self.save()
+        self.storage.apply({record.name.value: record}, self.data)
         return True
     
     def find(self, name):
-        """Find a contact by name"""
-        return self.data.get(name)
+        """Find a contact by name, ignoring case when no name matches exactly and only one does otherwise"""
+        record = self.data.get(name)
+        if record is not None:
+            return record
+        matches = self.find_all(name)
+        return matches[0] if len(matches) == 1 else None
+    
+    def find_all(self, name):
+        """Contacts whose name equals name ignoring case"""
+        # The index holds search keys, which also match transliterated names
+        folded = name.casefold()
+        return [self.data[key] for key in self._names().find(search_key(name)) if key.casefold() == folded]
+    
+    def find_by_prefix(self, prefix, limit=None):
+        """Contacts whose name starts with prefix as a search key, in name order"""
+        return [self.data[key] for key in self._names().prefix(search_key(prefix), limit)]
     
     def delete(self, name):
         """Delete a contact by name"""
         if name in self.data:
-            del self.data[name]
-            self.save()
+            record = self.data.pop(name)
+            self._unindex_record(record)
+            if self.name_index is not None:
+                self.name_index.remove(name)
+            self.storage.apply({name: None}, self.data)
             return True
         return False
     
-    def search(self, query):
-        """Search contacts by name, phone, email, or address"""
-        query = query.lower()
-        results = []
+    def update_record(self, record, old_name=None):
+        """Persist changes made to a record, moving it to its new key if it was renamed"""
+        changes = {}
+        if old_name is not None and old_name != record.name.value:
+            moved = self.data.pop(old_name, None)
+            if moved is not None and moved is not record:
+                self._unindex_record(moved)
+            if self.name_index is not None:
+                self.name_index.remove(old_name)
+            changes[old_name] = None
+        self._index_name(record.name.value)
+        self.data[record.name.value] = record
+        changes[record.name.value] = record
+        # Fields may have been assigned directly, bypassing the record's change notification
+        if self._indexes():
+            self._index_record(record)
+        return self.storage.apply(changes, self.data)
+    
+    def search(self, query, fuzzy=False, limit=FUZZY_LIMIT):
+        """
+        Search contacts by name, phone, email, or address.
+        In fuzzy mode the limit contacts most similar to the query are returned
+        instead, best first, so misspelled queries still find something.
+        """
+        if fuzzy:
+            return self.fuzzy_search(query, limit)
+        if DOMAIN_QUERY.match(query):
+            return self.find_by_email_domain(query)
         
-        for record in self.data.values():
-            # Search in name
-            if query in record.name.value.lower():
-                results.append(record)
-                continue
-            
-            # Search in phones
-            for phone in record.phones:
-                if query in phone.value:
-                    results.append(record)
-                    break
+        # Let the storage backend answer from its indexes when it can
+        phone_forms = self._phone_forms(query)
+        names = self.storage.backend.search_contacts(query, phone_forms)
+        if names is not None:
+            return [self.data[name] for name in names]
+        
+        query = search_key(query)
+        if self.search_index is None:
+            self.rebuild_search_index()
+        
+        # Only records holding every trigram of the query can match
+        candidates = self.search_index.candidates(query, *phone_forms)
+        records = self.data.values() if candidates is None else candidates
+        return [record for record in records if self._matches(record, query, phone_forms)]
+    
+    def fuzzy_search(self, query, limit=FUZZY_LIMIT, threshold=FUZZY_THRESHOLD):
+        """The limit contacts sharing the most trigrams with the query, best first"""
+        if self.search_index is None:
+            self.rebuild_search_index()
+        return [record for record, _ in self.search_index.similar(search_key(query), limit, threshold)]
+    
+    def query(self, text):
+        """Contacts matching a structured query such as 'email:@acme.com birthday:03-*'"""
+        return Plan(self, text).execute()
+    
+    def explain(self, text):
+        """(matching contacts, lines describing the plan that found them) for a structured query"""
+        plan = Plan(self, text)
+        results = plan.execute()
+        return results, plan.explain()
+    
+    def condition(self, term):
+        """Query condition of one term of a structured query"""
+        field = check_field(term, QUERY_FIELDS)
+        value = term.value
+        if field == "text":
+            phone_forms = self._phone_forms(value)
+            query = search_key(value)
+            return Condition(term, lambda record: self._matches(record, query, phone_forms),
+                             lambda: self._candidates(query, *phone_forms), "trigram index")
+        if field == "name":
+            return name_condition(self, term)
+        if field == "phone":
+            return self._phone_condition(term)
+        if field == "email":
+            return self._email_condition(term)
+        if field == "address":
+            match = text_match(value)
+            # The trigram index also holds the other fields, so it only narrows the search
+            lookup = None if "*" in value else lambda: self._candidates(search_key(value))
+            return Condition(term, lambda record: bool(record.address) and match(record.address.key), lookup,
+                             "trigram index")
+        if field == "birthday":
+            return self._birthday_condition(term)
+        return dated_condition(term, f"{field}_at")
+    
+    def _phone_condition(self, term):
+        """Condition on phone numbers: exact and number* are answered by the phone index"""
+        prefix = prefix_of(term.value)
+        if prefix is not None:
+            number = normalize_phone(prefix)
+            match = lambda record: any(phone.startswith(number) for phone in self._phone_numbers(record))
+            return Condition(term, match,
+                             lambda: [record.name.value for record in self.find_by_phone_prefix(prefix)],
+                             "phone index (prefix)")
+        if "*" not in term.value:
+            number = normalize_phone(term.value)
+            return Condition(term, lambda record: number in self._phone_numbers(record),
+                             lambda: [record.name.value for record in self.find_by_phone(term.value)],
+                             "phone index (exact)")
+        match = text_match(term.value)
+        return Condition(term, lambda record: any(match(phone.key) for phone in record.phones))
+    
+    def _email_condition(self, term):
+        """
+        Condition on emails: @domain, @*.domain (its subdomains), local@ and whole
+        addresses are answered by the email index, other values match as text.
+        """
+        value = search_key(term.value)
+        names = lambda records: [record.name.value for record in records]
+        match = text_match(value)
+        test = lambda record: any(match(email.key) for email in record.emails)
+        if value.startswith("@") and "*" not in value[2:]:
+            domain = value[1:]
+            if domain.startswith("*."):
+                suffix = domain[1:]
+                test = lambda record: any(parts[1].endswith(suffix) for parts in self._email_parts(record))
+                return Condition(term, test, lambda: names(self.find_by_email_domain(domain[2:], subdomains=True)),
+                                 "email index (subdomains)")
+            if "*" not in domain:
+                test = lambda record: any(parts[1] == domain for parts in self._email_parts(record))
+                return Condition(term, test, lambda: names(self.find_by_email_domain(domain)),
+                                 "email index (domain)")
+        if "@" in value and "*" not in value and not value.startswith("@"):
+            local, _, domain = value.rpartition("@")
+            if domain:
+                test = lambda record: any(email.key == value for email in record.emails)
             else:
-                # Search in emails
-                for email in record.emails:
-                    if query in email.value.lower():
-                        results.append(record)
-                        break
-                else:
-                    # Search in address
-                    if record.address and query in record.address.value.lower():
-                        results.append(record)
-        
-        return results
+                test = lambda record: any(parts[0] == local for parts in self._email_parts(record))
+            return Condition(term, test, lambda: names(self.find_by_email_local(local)), "email index (local part)")
+        # The trigram index also holds the other fields, so it only narrows the search
+        lookup = None if "*" in value else lambda: self._candidates(value)
+        return Condition(term, test, lookup, "trigram index")
+    
+    def _birthday_condition(self, term):
+        """Condition on birthdays by day, month and optionally year, answered by the birthday calendar"""
+        found = BIRTHDAY_PATTERN.match(term.value)
+        if not found:
+            raise QueryError(f"Invalid birthday in '{term}', use MM-DD, MM-* or YYYY-MM-DD")
+        year = int(found.group(1)) if found.group(1) else None
+        month = int(found.group(2))
+        day = None if found.group(3) == "*" else int(found.group(3))
+        
+        def match(record):
+            date = self._birthday_date(record)
+            return (date is not None and date.month == month and (day is None or date.day == day)
+                    and (year is None or date.year == year))
+        
+        def lookup():
+            records = self.get_birthdays_in_month(month) if day is None else \
+                self.get_birthdays_between((month, day), (month, day))
+            return [record.name.value for record in records]
+        
+        return Condition(term, match, lookup, "birthday calendar")
+    
+    def _candidates(self, text, *alternatives):
+        """Names of the contacts the trigram index says may contain text, None if it cannot narrow the search"""
+        if self.search_index is None:
+            self.rebuild_search_index()
+        records = self.search_index.candidates(text, *alternatives)
+        return None if records is None else [record.name.value for record in records]
+    
+    def find_by_email_domain(self, domain, subdomains=False):
+        """Contacts with an email at domain (with subdomains, also at domains ending in .domain)"""
+        key = "@" + self._reversed_domain(search_key(domain).lstrip("@"))
+        index = self._emails()
+        if not subdomains:
+            return index.find(key)
+        # Every key of a subdomain starts with the key of the domain
+        return index.prefix(key)
+    
+    def find_by_email_local(self, local):
+        """Contacts with an email whose local part (before the @) has the search key of local"""
+        return self._emails().find(search_key(local) + "@")
+    
+    def email_domains(self):
+        """(domain, number of contacts with an email there) for every email domain, subdomains next to their parent"""
+        return [(".".join(reversed(key[1:-1].split("."))), count) for key, count in self._emails().counts("@")]
+    
+    def _emails(self):
+        """Email index, built on first use"""
+        if self.email_index is None:
+            self.rebuild_email_index()
+        return self.email_index
+    
+    @staticmethod
+    def _reversed_domain(domain):
+        """acme.com as com.acme.; the final dot keeps com.acme. from matching com.acmecorp."""
+        return ".".join(reversed([label for label in domain.split(".") if label])) + "."
+    
+    @staticmethod
+    def _email_parts(record):
+        """(local part, domain) of the search keys of the emails of a record"""
+        return [email.key.rpartition("@")[::2] for email in record.emails]
+    
+    @classmethod
+    def _email_keys(cls, record):
+        """Email index keys of a record: local@ and @reversed.domain. of each email"""
+        keys = []
+        for local, domain in cls._email_parts(record):
+            keys.append(local + "@")
+            keys.append("@" + cls._reversed_domain(domain))
+        return keys
+    
+    def find_by_phone(self, phone):
+        """Contacts with this phone number, in any accepted format"""
+        if self.phone_index is None:
+            self.rebuild_phone_index()
+        return self.phone_index.find(normalize_phone(phone))
+    
+    def find_by_phone_prefix(self, prefix, limit=None):
+        """Contacts with a phone number starting with prefix (in any accepted format)"""
+        if self.phone_index is None:
+            self.rebuild_phone_index()
+        return self.phone_index.prefix(normalize_phone(prefix), limit)
+    
+    @staticmethod
+    def _phone_forms(query):
+        """Digit forms under which a phone-like query is also looked for in phone numbers"""
+        if not PHONE_QUERY.match(query):
+            return ()
+        forms = {re.sub(r'\D', '', query), normalize_phone(query)}
+        forms.discard(query)
+        return tuple(forms)
+    
+    @staticmethod
+    def _matches(record, query, phone_forms=()):
+        """Whether a query, as a search key, occurs in the name, a phone, an email or the address"""
+        # Search in name
+        if query in record.name.key:
+            return True
+        
+        # Search in phones
+        for phone in record.phones:
+            if query in phone.value or any(form in phone.value for form in phone_forms):
+                return True
+        
+        # Search in emails
+        for email in record.emails:
+            if query in email.key:
+                return True
+        
+        # Search in address
+        return bool(record.address and query in record.address.key)
+    
+    @staticmethod
+    def _search_texts(record):
+        """Texts of a record that search looks into, as _matches compares them"""
+        texts = [record.name.key]
+        texts.extend(phone.value for phone in record.phones)
+        texts.extend(email.key for email in record.emails)
+        if record.address:
+            texts.append(record.address.key)
+        return texts
+    
+    @staticmethod
+    def _phone_numbers(record):
+        """Canonical phone numbers of a record (normalized again for records stored before that)"""
+        return [normalize_phone(phone.value) for phone in record.phones]
+    
+    @staticmethod
+    def _birthday_date(record):
+        """Birthday date of a record, None if it has none"""
+        return record.birthday.date if record.birthday else None
+    
+    def rebuild_search_index(self):
+        """Build the search index from all stored contacts"""
+        self.search_index = NGramIndex()
+        for record in self.data.values():
+            record._observer = self._record_changed
+            self.search_index.add(record, self._search_texts(record))
+    
+    def rebuild_phone_index(self):
+        """Build the phone number index from all stored contacts"""
+        entries = []
+        for record in self.data.values():
+            record._observer = self._record_changed
+            entries.append((record, self._phone_numbers(record)))
+        # Sorted once rather than inserted number by number
+        self.phone_index = SortedIndex(entries)
+    
+    def rebuild_email_index(self):
+        """Build the email index from all stored contacts"""
+        entries = []
+        for record in self.data.values():
+            record._observer = self._record_changed
+            entries.append((record, self._email_keys(record)))
+        self.email_index = SortedIndex(entries)
+    
+    def rebuild_birthday_index(self):
+        """Build the birthday calendar from all stored contacts"""
+        self.birthday_index = BirthdayIndex()
+        for record in self.data.values():
+            record._observer = self._record_changed
+            self.birthday_index.add(record, self._birthday_date(record))
+    
+    def _names(self):
+        """Name index, built on first use"""
+        if self.name_index is None:
+            # Keys only, so lazily loaded records stay on disk
+            self.name_index = SortedIndex((name, [search_key(name)]) for name in self.data)
+        return self.name_index
+    
+    def _index_name(self, name):
+        """Add a name to the name index if it is built"""
+        if self.name_index is not None:
+            self.name_index.add(name, [search_key(name)])
+    
+    def _indexes(self):
+        """(index, function giving what a record is indexed under) for every index built so far"""
+        indexes = ((self.search_index, self._search_texts), (self.phone_index, self._phone_numbers),
+                   (self.email_index, self._email_keys), (self.birthday_index, self._birthday_date))
+        return [(index, values) for index, values in indexes if index is not None]
+    
+    def _index_record(self, record):
+        """(Re)index a record and follow its later changes"""
+        record._observer = self._record_changed
+        for index, values in self._indexes():
+            index.add(record, values(record))
+    
+    def _unindex_record(self, record):
+        """Drop a record from the indexes"""
+        for index, _ in self._indexes():
+            index.remove(record)
+    
+    def _record_changed(self, record):
+        """Reindex a record after one of its mutators ran"""
+        # A record deleted from the book is no longer in any index
+        if any(record in index for index, _ in self._indexes()):
+            self._index_record(record)
     
     def get_birthdays(self, days=7):
         """Get contacts with birthdays in the next N days"""
         today = datetime.now().date()
-        upcoming_birthdays = []
         
-        for record in self.data.values():
-            if record.birthday:
-                days_to_birthday = record.days_to_birthday()
-                if days_to_birthday is not None and days_to_birthday <= days:
-                    upcoming_birthdays.append((record, days_to_birthday))
+        # The storage backend may answer from its own indexes; otherwise use the calendar
+        names = self.storage.backend.find_birthdays(today, days)
+        if names is None:
+            if self.birthday_index is None:
+                self.rebuild_birthday_index()
+            return self.birthday_index.upcoming(today, days)
+        
+        upcoming_birthdays = []
+        for name in names:
+            record = self.data[name]
+            days_to_birthday = record.days_to_birthday(today)
+            if days_to_birthday is not None and days_to_birthday <= days:
+                upcoming_birthdays.append((record, days_to_birthday))
         
         # Sort by days to birthday
         upcoming_birthdays.sort(key=lambda x: x[1])
         
         return upcoming_birthdays
     
+    def get_birthdays_between(self, first, last):
+        """Contacts born between two (month, day) pairs, inclusive, in calendar order from first"""
+        if self.birthday_index is None:
+            self.rebuild_birthday_index()
+        return self.birthday_index.in_range(first, last)
+    
+    def get_birthdays_in_month(self, month):
+        """Contacts born in month (1-12), by day"""
+        if self.birthday_index is None:
+            self.rebuild_birthday_index()
+        return self.birthday_index.in_month(month)
+    
+    def import_file(self, path, file_format=None, stage=False):
+        """
+        Stream contacts from a CSV, JSONL or vCard file into the book and save them as one batch.
+        With stage, they wait with the other pending changes for the next flush instead.
+        Returns the number of imported contacts and the errors of the rows that were skipped.
+        """
+        errors = []
+        # Staged until the whole file is read, so a file that fails midway imports nothing
+        staged = {}
+        count = 0
+        for record in bulk_io.read_records(path, "contacts", file_format, errors):
+            staged[record.name.value] = record
+            count += 1
+        self.data.update(staged)
+        if count:
+            # Rebuilt on the next lookup rather than maintained row by row
+            self.search_index = None
+            self.name_index = None
+            self.phone_index = None
+            self.email_index = None
+            self.birthday_index = None
+            if stage:
+                self.storage.apply(staged, self.data)
+            else:
+                self.save()
+        return count, errors
+    
+    def export_file(self, path, file_format=None):
+        """Write all contacts to a CSV, JSONL or vCard file, returns how many were written"""
+        return bulk_io.write_records(path, "contacts", self.data.values(), file_format)
+    
     def save(self):
         """Save address book to storage"""
         return self.storage.save(self.data)
     
+    def flush(self):
+        """Write changes made since the last flush to storage"""
+        return self.storage.flush()
+    
+    def drain(self):
+        """Write every pending change and wait for the disk, returns the errors hit"""
+        return self.storage.drain()
+    
+    def storage_status(self):
+        """Pending changes, queued writes and last write latency of the address book storage"""
+        return self.storage.status()
+    
+    def reshard(self, count):
+        """Split the address book over count shard files (sharded storage only)"""
+        return self.storage.reshard(count, self.data)
+    
     def __str__(self):
         """String representation of the address book"""
         output = StringIO()
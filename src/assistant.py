@@ -3,6 +3,7 @@ from src.note_book import NoteBook
 from src.record import ContactRecord, NoteRecord
 from src.utils.input_parser import InputParser
 from src.utils.localization import Localization
+from src.utils.query import QueryError
 from src.utils.rich_formatter import RichFormatter
 from rich import box
 from rich.table import Table
@@ -13,13 +14,16 @@ class Assistant:
         self.address_book = AddressBook()
         self.note_book = NoteBook()
         self.running = False
-        self.localization = Localization()
+        self.localization = Localization.shared()
         
         # Define available commands
         self.commands = [
             "add contact", "show all", "search contacts", "edit contact", "delete contact", "birthdays",
             "add note", "show all notes", "search notes", "edit note", "delete note", "add tag", "search by tag", "sort by tags",
-            "help", "exit", "quit", "q", "change language", "джарвіс", "jarvis"
+            "help", "exit", "quit", "q", "change language", "джарвіс", "jarvis", "reshard storage",
+            "storage status", "import contacts", "export contacts", "import notes", "export notes",
+            "who is calling", "query contacts", "query notes", "explain query",
+            "email domains"
         ]
         
         # Initialize input parser
@@ -42,6 +46,18 @@ class Assistant:
                 self.running = False
             except Exception as e:
                 RichFormatter.print_error(self.localization.get_text("error").format(str(e)))
+            finally:
+                # One write per command, however many edits it made
+                self.flush()
+        
+        # Background writes may still be queued: wait for them and report failures
+        for error in self.address_book.drain() + self.note_book.drain():
+            RichFormatter.print_error(f"Error saving data: {error}")
+    
+    def flush(self):
+        """Write pending contact and note changes to disk"""
+        self.address_book.flush()
+        self.note_book.flush()
     
     def process_command(self, user_input):
         """Process user command with intelligent parsing"""
@@ -70,6 +86,16 @@ class Assistant:
             self.delete_contact()
         elif command == "birthdays":
             self.show_upcoming_birthdays()
+        elif command == "who is calling":
+            self.who_is_calling()
+        elif command == "email domains":
+            self.show_email_domains()
+        elif command == "query contacts":
+            self.query_records(self.address_book, "contacts")
+        elif command == "import contacts":
+            self.import_records(self.address_book, "contacts")
+        elif command == "export contacts":
+            self.export_records(self.address_book, "contacts")
         # Note commands
         elif command == "add note":
             self.add_note()
@@ -87,10 +113,22 @@ class Assistant:
             self.search_notes_by_tag()
         elif command == "sort by tags":
             self.sort_notes_by_tags()
+        elif command == "query notes":
+            self.query_records(self.note_book, "notes")
+        elif command == "import notes":
+            self.import_records(self.note_book, "notes")
+        elif command == "export notes":
+            self.export_records(self.note_book, "notes")
         elif command == "change language":
             self.change_language()
         elif command in ["джарвіс", "jarvis"]:
             self.toggle_jarvis_mode()
+        elif command == "reshard storage":
+            self.reshard_storage()
+        elif command == "storage status":
+            self.show_storage_status()
+        elif command == "explain query":
+            self.explain_query()
         else:
             # Try to guess the command with improved algorithm
             guessed_commands = self.input_parser.guess_commands(user_input)
@@ -177,7 +215,8 @@ class Assistant:
         contact_table.add_column("Command", style=contact_style)
         contact_table.add_column("Description", style=desc_style)
         
-        for cmd in ["add contact", "show all", "search contacts", "edit contact", "delete contact", "birthdays"]:
+        for cmd in ["add contact", "show all", "search contacts", "edit contact", "delete contact", "birthdays",
+                    "who is calling", "email domains", "query contacts", "import contacts", "export contacts"]:
             display_cmd = self.localization.get_text(cmd)
             # Use Jarvis-style descriptions if in Jarvis mode
             if jarvis_mode:
@@ -192,7 +231,8 @@ class Assistant:
         note_table.add_column("Command", style=note_style)
         note_table.add_column("Description", style=desc_style)
         
-        for cmd in ["add note", "show all notes", "search notes", "edit note", "delete note", "add tag", "search by tag", "sort by tags"]:
+        for cmd in ["add note", "show all notes", "search notes", "edit note", "delete note", "add tag", "search by tag", "sort by tags",
+                    "query notes", "import notes", "export notes"]:
             display_cmd = self.localization.get_text(cmd)
             # Use Jarvis-style descriptions if in Jarvis mode
             if jarvis_mode:
@@ -207,7 +247,7 @@ class Assistant:
         other_table.add_column("Command", style=other_style)
         other_table.add_column("Description", style=desc_style)
         
-        for cmd in ["help", "exit", "change language", "jarvis"]:
+        for cmd in ["help", "exit", "change language", "jarvis", "reshard storage", "storage status", "explain query"]:
             display_cmd = self.localization.get_text(cmd)
             # Use Jarvis-style descriptions if in Jarvis mode
             if jarvis_mode:
@@ -316,6 +356,15 @@ class Assistant:
                 RichFormatter.print_warning(f"Scan complete. No human records found matching query '{query}'.")
             else:
                 RichFormatter.print_warning(f"No contacts found for query '{query}'.")
+            
+            # Offer the closest contacts in case the query was misspelled
+            similar = self.address_book.search(query, fuzzy=True)
+            if similar:
+                if RichFormatter.jarvis_mode:
+                    RichFormatter.print_info("Approximate pattern match suggests these records:")
+                else:
+                    RichFormatter.print_info("Did you mean:")
+                RichFormatter.display_contacts_table(similar)
             return
         
         if RichFormatter.jarvis_mode:
@@ -361,17 +410,16 @@ class Assistant:
                 field = options[idx]
                 if field == "name":
                     new_name = RichFormatter.ask_input("Enter new name: ")
-                    if new_name and new_name != name:
-                        # Check if the new name already exists
-                        if self.address_book.find(new_name):
+                    if new_name and new_name != record.name.value:
+                        # Check if the new name already exists (renaming to another case of the same name is fine)
+                        existing = self.address_book.find(new_name)
+                        if existing is not None and existing is not record:
                             RichFormatter.print_error(f"Contact '{new_name}' already exists.")
                             return
                         old_name = record.name.value
                         record.edit_name(new_name)
                         # Update the key in the address book
-                        self.address_book.data[new_name] = record
-                        del self.address_book.data[old_name]
-                        self.address_book.save()
+                        self.address_book.update_record(record, old_name)
                         RichFormatter.print_success(f"Name updated from '{old_name}' to '{new_name}'.")
                 elif field == "phones":
                     self._edit_phones(record)
@@ -405,7 +453,7 @@ class Assistant:
         confirm = RichFormatter.ask_confirm(f"Are you sure you want to delete contact '{name}'?", False)
         
         if confirm:
-            self.address_book.delete(name)
+            self.address_book.delete(record.name.value)
             RichFormatter.print_success(f"Contact '{name}' deleted successfully.")
         else:
             RichFormatter.print_info("Deletion cancelled.")
@@ -549,24 +597,23 @@ class Assistant:
                 field = options[idx]
                 if field == "title":
                     new_title = RichFormatter.ask_input("Enter new title: ")
-                    if new_title and new_title != title:
-                        # Check if the new title already exists
-                        if self.note_book.find(new_title):
+                    if new_title and new_title != note.name.value:
+                        # Check if the new title already exists (renaming to another case of the same title is fine)
+                        existing = self.note_book.find(new_title)
+                        if existing is not None and existing is not note:
                             RichFormatter.print_error(f"Note '{new_title}' already exists.")
                             return
                         old_title = note.name.value
                         note.edit_name(new_title)
                         # Update the key in the note book
-                        self.note_book.data[new_title] = note
-                        del self.note_book.data[old_title]
-                        self.note_book.save()
+                        self.note_book.update_record(note, old_title)
                         RichFormatter.print_success(f"Title updated from '{old_title}' to '{new_title}'.")
                 elif field == "content":
                     current_content = note.content
                     RichFormatter.print_info(f"Current content: {current_content}")
                     new_content = RichFormatter.ask_input("Enter new content: ")
                     note.edit_content(new_content)
-                    self.note_book.save()
+                    self.note_book.update_record(note)
                     RichFormatter.print_success("Content updated successfully.")
                 elif field == "tags":
                     self._edit_note_tags(note)
@@ -594,7 +641,7 @@ class Assistant:
         confirm = RichFormatter.ask_confirm(f"Are you sure you want to delete note '{title}'?", False)
         
         if confirm:
-            self.note_book.delete(title)
+            self.note_book.delete(note.name.value)
             RichFormatter.print_success(f"Note '{title}' deleted successfully.")
         else:
             RichFormatter.print_info("Deletion cancelled.")
@@ -648,7 +695,7 @@ class Assistant:
                     tag = tag[1:]
                 
                 if note.add_tag(tag):
-                    self.note_book.save()
+                    self.note_book.update_record(note)
                     RichFormatter.print_success(f"Tag #{tag} added successfully.")
                 else:
                     RichFormatter.print_warning(f"Tag #{tag} already exists for this note.")
@@ -670,7 +717,7 @@ class Assistant:
                     if 1 <= idx <= len(note.tags):
                         tag_to_remove = note.tags[idx-1].value
                         if note.remove_tag(tag_to_remove):
-                            self.note_book.save()
+                            self.note_book.update_record(note)
                             RichFormatter.print_success(f"Tag #{tag_to_remove} removed successfully.")
                         else:
                             RichFormatter.print_error(f"Failed to remove tag #{tag_to_remove}.")
@@ -757,7 +804,7 @@ class Assistant:
                         continue
                     try:
                         record.add_phone(phone)
-                        self.address_book.save()
+                        self.address_book.update_record(record)
                         RichFormatter.print_success(f"Phone number {phone} added successfully.")
                         break
                     except ValueError as e:
@@ -784,7 +831,7 @@ class Assistant:
                                     continue
                                 try:
                                     if record.edit_phone(old_phone, new_phone):
-                                        self.address_book.save()
+                                        self.address_book.update_record(record)
                                         RichFormatter.print_success(f"Phone number updated from {old_phone} to {new_phone}.")
                                         break
                                     else:
@@ -815,7 +862,7 @@ class Assistant:
                         if 1 <= idx <= len(record.phones):
                             phone = record.phones[idx-1].value
                             if record.remove_phone(phone):
-                                self.address_book.save()
+                                self.address_book.update_record(record)
                                 RichFormatter.print_success(f"Phone number {phone} removed successfully.")
                                 break
                             else:
@@ -870,7 +917,7 @@ class Assistant:
                                 new_email = RichFormatter.ask_input(f"Enter new email to replace {old_email}: ")
                                 try:
                                     if record.edit_email(old_email, new_email):
-                                        self.address_book.save()
+                                        self.address_book.update_record(record)
                                         RichFormatter.print_success(f"Email updated from {old_email} to {new_email}.")
                                         break
                                     else:
@@ -899,7 +946,7 @@ class Assistant:
                         if 1 <= idx <= len(record.emails):
                             email = record.emails[idx-1].value
                             if record.remove_email(email):
-                                self.address_book.save()
+                                self.address_book.update_record(record)
                                 RichFormatter.print_success(f"Email {email} removed successfully.")
                                 break
                             else:
@@ -917,7 +964,7 @@ class Assistant:
                     email = RichFormatter.ask_input("Enter new email: ")
                     try:
                         record.add_email(email)
-                        self.address_book.save()
+                        self.address_book.update_record(record)
                         RichFormatter.print_success(f"Email {email} added successfully.")
                         break
                     except ValueError as e:
@@ -936,7 +983,7 @@ class Assistant:
                 email = RichFormatter.ask_input("No emails set. Enter email: ")
                 try:
                     record.add_email(email)
-                    self.address_book.save()
+                    self.address_book.update_record(record)
                     RichFormatter.print_success(f"Email {email} added successfully.")
                     break
                 except ValueError as e:
@@ -956,7 +1003,7 @@ class Assistant:
                     birthday = RichFormatter.ask_input("Enter new birthday (YYYY-MM-DD): ")
                     try:
                         record.set_birthday(birthday)
-                        self.address_book.save()
+                        self.address_book.update_record(record)
                         RichFormatter.print_success(f"Birthday updated to {birthday}.")
                         break
                     except ValueError as e:
@@ -965,7 +1012,7 @@ class Assistant:
             
             elif choice == "2":
                 record.birthday = None
-                self.address_book.save()
+                self.address_book.update_record(record)
                 RichFormatter.print_success("Birthday removed.")
             
             else:
@@ -977,7 +1024,7 @@ class Assistant:
                 birthday = RichFormatter.ask_input("No birthday set. Enter birthday (YYYY-MM-DD): ")
                 try:
                     record.set_birthday(birthday)
-                    self.address_book.save()
+                    self.address_book.update_record(record)
                     RichFormatter.print_success(f"Birthday set to {birthday}.")
                     break
                 except ValueError as e:
@@ -995,12 +1042,12 @@ class Assistant:
             if choice == "1":
                 address = RichFormatter.ask_input("Enter new address: ")
                 record.set_address(address)
-                self.address_book.save()
+                self.address_book.update_record(record)
                 RichFormatter.print_success(f"Address updated to {address}.")
             
             elif choice == "2":
                 record.address = None
-                self.address_book.save()
+                self.address_book.update_record(record)
                 RichFormatter.print_success("Address removed.")
             
             else:
@@ -1010,7 +1057,7 @@ class Assistant:
             # No address set, just add a new one
             address = RichFormatter.ask_input("No address set. Enter address: ")
             record.set_address(address)
-            self.address_book.save()
+            self.address_book.update_record(record)
             RichFormatter.print_success(f"Address set to {address}.")
     
     def change_language(self):
@@ -1042,6 +1089,157 @@ class Assistant:
         except ValueError:
             RichFormatter.print_error("Please enter a valid number.")
 
+    def reshard_storage(self):
+        """Redistribute sharded contact and note storage over a new number of shards"""
+        try:
+            count = int(RichFormatter.ask_input("Enter number of shards: ", "16"))
+        except ValueError:
+            RichFormatter.print_error("Please enter a valid number.")
+            return
+        if count < 1:
+            RichFormatter.print_error("Number of shards should be positive.")
+            return
+        
+        try:
+            previous = self.address_book.storage_status()["shards"]
+            if not self.address_book.reshard(count):
+                RichFormatter.print_error("Contact storage could not be redistributed; nothing was changed.")
+                return
+            if not self.note_book.reshard(count):
+                # Keep both books in the same layout
+                if previous is not None and self.address_book.reshard(previous):
+                    RichFormatter.print_error("Note storage could not be redistributed; nothing was changed.")
+                else:
+                    RichFormatter.print_error(f"Note storage could not be redistributed; contacts now use {count} shards.")
+                return
+        except ValueError as e:
+            RichFormatter.print_error(f"Error: {e}")
+            return
+        RichFormatter.print_success(f"Storage redistributed over {count} shards.")
+
+    def who_is_calling(self):
+        """Find the contact a phone number belongs to"""
+        phone = RichFormatter.ask_input("Enter phone number (or its beginning): ")
+        if not phone:
+            RichFormatter.print_error("Phone number cannot be empty.")
+            return
+        
+        # An exact match first, otherwise the numbers starting with what was entered
+        results = self.address_book.find_by_phone(phone) or self.address_book.find_by_phone_prefix(phone, limit=20)
+        if not results:
+            RichFormatter.print_warning(f"No contact has phone number '{phone}'.")
+            return
+        RichFormatter.display_contacts_table(results)
+    
+    def show_email_domains(self):
+        """Show every email domain with the number of contacts at it, most common first"""
+        domains = self.address_book.email_domains()
+        if not domains:
+            RichFormatter.print_warning("No contact has an email address.")
+            return
+        
+        table = Table(title="Email Domains", box=box.ROUNDED, expand=False)
+        table.add_column("Domain", style="cyan")
+        table.add_column("Contacts", justify="right")
+        for domain, count in sorted(domains, key=lambda entry: -entry[1]):
+            table.add_row(domain, str(count))
+        RichFormatter.console.print(table)
+    
+    def query_records(self, book, kind):
+        """Find contacts or notes with a structured query"""
+        text = RichFormatter.ask_input("Enter query (field:value, e.g. tag:work or birthday:03-*): ")
+        if not text:
+            RichFormatter.print_error("Query cannot be empty.")
+            return
+        
+        try:
+            results = book.query(text)
+        except QueryError as e:
+            RichFormatter.print_error(f"Invalid query: {e}")
+            return
+        
+        if not results:
+            RichFormatter.print_warning(f"No {kind} match query '{text}'.")
+            return
+        RichFormatter.print_success(f"Found {len(results)} {kind}:")
+        if kind == "contacts":
+            RichFormatter.display_contacts_table(results)
+        else:
+            RichFormatter.display_notes_table(results)
+    
+    def explain_query(self):
+        """Show how a structured query is answered"""
+        kind = RichFormatter.ask_input("Query contacts or notes? ").strip().lower()
+        if kind not in ("contacts", "notes"):
+            RichFormatter.print_error("Please answer 'contacts' or 'notes'.")
+            return
+        text = RichFormatter.ask_input("Enter query: ")
+        if not text:
+            RichFormatter.print_error("Query cannot be empty.")
+            return
+        
+        book = self.address_book if kind == "contacts" else self.note_book
+        try:
+            results, plan = book.explain(text)
+        except QueryError as e:
+            RichFormatter.print_error(f"Invalid query: {e}")
+            return
+        
+        RichFormatter.print_header("Query Plan")
+        for line in plan:
+            RichFormatter.print_info(line)
+        RichFormatter.print_success(f"{len(results)} {kind} matched.")
+    
+    def import_records(self, book, kind):
+        """Import contacts or notes from a CSV, JSONL or vCard file"""
+        path = RichFormatter.ask_input("Enter file path (.csv, .jsonl or .vcf): ")
+        if not path:
+            RichFormatter.print_error("File path cannot be empty.")
+            return
+        
+        try:
+            count, errors = book.import_file(path)
+        except (OSError, ValueError) as e:
+            RichFormatter.print_error(f"Error importing {kind}: {e}")
+            return
+        
+        # A few examples are enough to fix the file
+        for error in errors[:10]:
+            RichFormatter.print_warning(f"Skipped {error}")
+        if len(errors) > 10:
+            RichFormatter.print_warning(f"... and {len(errors) - 10} more invalid rows.")
+        RichFormatter.print_success(f"Imported {count} {kind}.")
+    
+    def export_records(self, book, kind):
+        """Export contacts or notes to a CSV, JSONL or vCard file"""
+        path = RichFormatter.ask_input("Enter file path (.csv, .jsonl or .vcf): ")
+        if not path:
+            RichFormatter.print_error("File path cannot be empty.")
+            return
+        
+        try:
+            count = book.export_file(path)
+        except (OSError, ValueError) as e:
+            RichFormatter.print_error(f"Error exporting {kind}: {e}")
+            return
+        RichFormatter.print_success(f"Exported {count} {kind} to {path}.")
+
+    def show_storage_status(self):
+        """Show unwritten changes and write latency of the contact and note storage"""
+        table = Table(title="Storage Status", box=box.ROUNDED, expand=False)
+        table.add_column("Book")
+        table.add_column("Pending changes", justify="right")
+        table.add_column("Queued writes", justify="right")
+        table.add_column("Last write", justify="right")
+        
+        for title, book in (("Contacts", self.address_book), ("Notes", self.note_book)):
+            status = book.storage_status()
+            latency = status["last_latency"]
+            table.add_row(title, str(status["pending_changes"]), str(status["queued_writes"]),
+                          "-" if latency is None else f"{latency * 1000:.1f} ms")
+        
+        RichFormatter.console.print(table)
+
     def toggle_jarvis_mode(self):
         """Toggle Jarvis mode on/off"""
         is_enabled = RichFormatter.toggle_jarvis_mode()
@@ -0,0 +1,337 @@
+"""
+Non-interactive execution of assistant commands.
+
+A script holds one fully specified command per line, with its arguments as
+key=value pairs (quoted like a shell command when they contain spaces), e.g.
+
+    add contact name="John Smith" phone=0501234567 phone=0671234567 birthday=1990-05-17
+    add note name=Groceries content="milk, bread" tag=shopping
+    search contacts query=john
+
+Empty lines and lines starting with # are skipped. Nothing is asked and
+nothing is written to disk until the script ends, when every change is
+saved at once. Each command prints one status line, the records it found
+follow it indented, and a summary with the throughput closes the run.
+"""
+import shlex
+import sys
+import time
+from src.address_book import AddressBook
+from src.note_book import NoteBook
+from src.record import ContactRecord, NoteRecord
+from src.field import Name, Phone, Email, Birthday, Tag
+from src.utils.input_parser import InputParser
+from src.utils.query import QueryError
+from src.utils.validators import normalize_phone
+
+class BatchError(ValueError):
+    """A command that cannot be run as written"""
+
+class BatchRunner:
+    """Runs scripted commands against the books without prompting"""
+    # Command -> handler method; arguments are documented on each handler
+    HANDLERS = {
+        "add contact": "add_contact",
+        "edit contact": "edit_contact",
+        "delete contact": "delete_contact",
+        "search contacts": "search_contacts",
+        "who is calling": "who_is_calling",
+        "birthdays": "birthdays",
+        "query contacts": "query_contacts",
+        "import contacts": "import_contacts",
+        "export contacts": "export_contacts",
+        "add note": "add_note",
+        "edit note": "edit_note",
+        "delete note": "delete_note",
+        "add tag": "add_tag",
+        "search notes": "search_notes",
+        "search by tag": "search_by_tag",
+        "query notes": "query_notes",
+        "import notes": "import_notes",
+        "export notes": "export_notes",
+    }
+    
+    def __init__(self, address_book=None, note_book=None, output=None):
+        self.address_book = address_book if address_book is not None else AddressBook()
+        self.note_book = note_book if note_book is not None else NoteBook()
+        self.output = output or sys.stdout
+        self.input_parser = InputParser(list(self.HANDLERS))
+    
+    def run(self, lines):
+        """Run every command of lines, save once, returns the number of failed commands"""
+        count = failed = 0
+        start = time.perf_counter()
+        # No idle flush writes part of the script while it runs
+        storages = [self.address_book.storage, self.note_book.storage]
+        delays = [storage.flush_delay for storage in storages]
+        for storage in storages:
+            storage.set_flush_delay(0)
+        try:
+            for number, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                count += 1
+                if not self.execute(number, line):
+                    failed += 1
+            
+            # One write for the whole script
+            self.address_book.flush()
+            self.note_book.flush()
+            errors = self.address_book.drain() + self.note_book.drain()
+        finally:
+            for storage, delay in zip(storages, delays):
+                storage.set_flush_delay(delay)
+        for error in errors:
+            self.write(f"Error saving data: {error}")
+        
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed else 0.0
+        self.write(f"{count} commands, {failed} failed in {elapsed:.3f} s ({rate:.0f} commands/s)")
+        return failed + len(errors)
+    
+    def execute(self, number, line):
+        """Run one command line and report its status, returns whether it succeeded"""
+        command, args = self.input_parser.parse_input(line)
+        handler = self.HANDLERS.get(command)
+        if handler is None:
+            self.write(f"{number}: error: unknown command '{line}'")
+            return False
+        try:
+            results = getattr(self, handler)(self.arguments(args))
+        except (BatchError, ValueError, OSError, QueryError) as e:
+            self.write(f"{number}: error {command}: {e}")
+            return False
+        
+        self.write(f"{number}: ok {command}")
+        for result in results or ():
+            self.write(f"  {result}")
+        return True
+    
+    def write(self, text):
+        print(text, file=self.output)
+    
+    @staticmethod
+    def arguments(text):
+        """{key: [values]} of the key=value pairs of text; a key may be repeated"""
+        try:
+            words = shlex.split(text)
+        except ValueError as e:
+            raise BatchError(str(e))
+        arguments = {}
+        for word in words:
+            key, separator, value = word.partition("=")
+            if not separator or not key:
+                raise BatchError(f"expected key=value, got '{word}'")
+            arguments.setdefault(key.lower(), []).append(value)
+        return arguments
+    
+    @staticmethod
+    def one(arguments, key, default=None):
+        """Last value given for key, default if there is none; required if default is None"""
+        values = arguments.get(key)
+        if values:
+            return values[-1]
+        if default is None:
+            raise BatchError(f"missing {key}=")
+        return default
+    
+    # Contacts
+    def add_contact(self, arguments):
+        """name=, phone=*, email=*, birthday=, address="""
+        name = self.one(arguments, "name")
+        if self.address_book.find(name):
+            raise BatchError(f"contact '{name}' already exists")
+        # The record is complete before it is stored, so a bad value stores nothing
+        record = ContactRecord(name)
+        for phone in arguments.get("phone", []):
+            record.add_phone(phone)
+        for email in arguments.get("email", []):
+            record.add_email(email)
+        if "birthday" in arguments:
+            record.set_birthday(self.one(arguments, "birthday"))
+        if "address" in arguments:
+            record.set_address(self.one(arguments, "address"))
+        self.address_book.add_record(record)
+    
+    def edit_contact(self, arguments):
+        """name=, new_name=, phone=* (added), remove_phone=*, email=* (added), remove_email=*, birthday=, address="""
+        record = self.find_contact(arguments)
+        # Every value is checked before the record changes
+        new_name = Name(self.one(arguments, "new_name")).value if "new_name" in arguments else None
+        for phone in arguments.get("phone", []):
+            Phone(phone)
+        for email in arguments.get("email", []):
+            Email(email)
+        if "birthday" in arguments:
+            Birthday(self.one(arguments, "birthday"))
+        owner = f"contact '{record.name.value}'"
+        self.check_removals(owner, "phone", arguments.get("remove_phone", []),
+                            [phone.value for phone in record.phones], normalize_phone)
+        self.check_removals(owner, "email", arguments.get("remove_email", []),
+                            [email.value for email in record.emails])
+        if new_name and new_name != record.name.value:
+            existing = self.address_book.find(new_name)
+            if existing is not None and existing is not record:
+                raise BatchError(f"contact '{new_name}' already exists")
+        
+        old_name = record.name.value
+        if new_name and new_name != old_name:
+            record.edit_name(new_name)
+        for phone in arguments.get("remove_phone", []):
+            record.remove_phone(phone)
+        for phone in arguments.get("phone", []):
+            record.add_phone(phone)
+        for email in arguments.get("remove_email", []):
+            record.remove_email(email)
+        for email in arguments.get("email", []):
+            record.add_email(email)
+        if "birthday" in arguments:
+            record.set_birthday(self.one(arguments, "birthday"))
+        if "address" in arguments:
+            record.set_address(self.one(arguments, "address"))
+        self.address_book.update_record(record, old_name)
+    
+    def delete_contact(self, arguments):
+        """name="""
+        self.address_book.delete(self.find_contact(arguments).name.value)
+    
+    @staticmethod
+    def check_removals(owner, kind, values, stored, key=lambda value: value):
+        """BatchError unless every value is among stored (compared by key), each one removing a single match"""
+        remaining = list(stored)
+        for value in values:
+            if key(value) not in remaining:
+                raise BatchError(f"{owner} has no {kind} {value}")
+            remaining.remove(key(value))
+    
+    def find_contact(self, arguments):
+        name = self.one(arguments, "name")
+        record = self.address_book.find(name)
+        if record is None:
+            raise BatchError(f"contact '{name}' not found")
+        return record
+    
+    def search_contacts(self, arguments):
+        """query="""
+        return [record.name.value for record in self.address_book.search(self.one(arguments, "query"))]
+    
+    def who_is_calling(self, arguments):
+        """phone= (or its beginning)"""
+        phone = self.one(arguments, "phone")
+        results = self.address_book.find_by_phone(phone) or self.address_book.find_by_phone_prefix(phone, limit=20)
+        return [record.name.value for record in results]
+    
+    def birthdays(self, arguments):
+        """days= (7 by default)"""
+        days = int(self.one(arguments, "days", "7"))
+        if days < 0:
+            raise BatchError("days should be positive")
+        return [f"{record.name.value}: {record.birthday.value} (in {days_left} days)"
+                for record, days_left in self.address_book.get_birthdays(days)]
+    
+    def query_contacts(self, arguments):
+        """query= (field:value terms)"""
+        return [record.name.value for record in self.address_book.query(self.one(arguments, "query"))]
+    
+    def import_contacts(self, arguments):
+        """path=, format="""
+        return self.import_records(self.address_book, arguments)
+    
+    def export_contacts(self, arguments):
+        """path=, format="""
+        self.address_book.export_file(self.one(arguments, "path"), self.one(arguments, "format", "") or None)
+    
+    # Notes
+    def add_note(self, arguments):
+        """name= (or title=), content=, tag=*"""
+        name = self.one(arguments, "name", "") or self.one(arguments, "title")
+        if self.note_book.find(name):
+            raise BatchError(f"note '{name}' already exists")
+        record = NoteRecord(name, self.one(arguments, "content", ""))
+        for tag in arguments.get("tag", []):
+            record.add_tag(tag)
+        self.note_book.add_record(record)
+    
+    def edit_note(self, arguments):
+        """name=, new_name=, content=, tag=* (added), remove_tag=*"""
+        note = self.find_note(arguments)
+        new_name = Name(self.one(arguments, "new_name")).value if "new_name" in arguments else None
+        for tag in arguments.get("tag", []):
+            Tag(tag)
+        # As in remove_tag: one leading # is dropped and case is ignored
+        self.check_removals(f"note '{note.name.value}'", "tag", arguments.get("remove_tag", []),
+                            [tag.value.lower() for tag in note.tags],
+                            lambda tag: (tag[1:] if tag.startswith("#") else tag).lower())
+        if new_name and new_name != note.name.value:
+            existing = self.note_book.find(new_name)
+            if existing is not None and existing is not note:
+                raise BatchError(f"note '{new_name}' already exists")
+        
+        old_name = note.name.value
+        if new_name and new_name != old_name:
+            note.edit_name(new_name)
+        if "content" in arguments:
+            note.edit_content(self.one(arguments, "content"))
+        for tag in arguments.get("remove_tag", []):
+            note.remove_tag(tag)
+        for tag in arguments.get("tag", []):
+            note.add_tag(tag)
+        self.note_book.update_record(note, old_name)
+    
+    def delete_note(self, arguments):
+        """name="""
+        self.note_book.delete(self.find_note(arguments).name.value)
+    
+    def add_tag(self, arguments):
+        """name=, tag=*"""
+        note = self.find_note(arguments)
+        tags = arguments.get("tag")
+        if not tags:
+            raise BatchError("missing tag=")
+        for tag in tags:
+            Tag(tag)
+        for tag in tags:
+            note.add_tag(tag)
+        self.note_book.update_record(note)
+    
+    def find_note(self, arguments):
+        name = self.one(arguments, "name", "") or self.one(arguments, "title")
+        note = self.note_book.find(name)
+        if note is None:
+            raise BatchError(f"note '{name}' not found")
+        return note
+    
+    def search_notes(self, arguments):
+        """query="""
+        return [record.name.value for record in self.note_book.search(self.one(arguments, "query"))]
+    
+    def search_by_tag(self, arguments):
+        """tag="""
+        return [record.name.value for record in self.note_book.search_by_tag(self.one(arguments, "tag"))]
+    
+    def query_notes(self, arguments):
+        """query= (field:value terms)"""
+        return [record.name.value for record in self.note_book.query(self.one(arguments, "query"))]
+    
+    def import_notes(self, arguments):
+        """path=, format="""
+        return self.import_records(self.note_book, arguments)
+    
+    def export_notes(self, arguments):
+        """path=, format="""
+        self.note_book.export_file(self.one(arguments, "path"), self.one(arguments, "format", "") or None)
+    
+    def import_records(self, book, arguments):
+        """Import a file into book, reporting the count and the rows that were skipped"""
+        count, errors = book.import_file(self.one(arguments, "path"), self.one(arguments, "format", "") or None,
+                                         stage=True)
+        return [f"imported {count}"] + [f"skipped {error}" for error in errors]
+
+def run_script(path):
+    """Run the commands of the file at path ("-" for stdin), returns the number of failures"""
+    runner = BatchRunner()
+    if path == "-":
+        return runner.run(sys.stdin)
+    with open(path, encoding="utf-8") as file:
+        return runner.run(file)
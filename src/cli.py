@@ -0,0 +1,119 @@
+"""
+One-shot subcommands for shell pipelines and cron jobs.
+
+Each subcommand loads only the book it reads, answers one query and prints
+one line per result (tab-separated fields) or, with --json, a JSON array of
+records. Neither the interactive interface nor Rich is loaded. The exit
+status is 0 when something was found, 1 when nothing was and 2 on errors,
+as with grep.
+"""
+import argparse
+import json
+import sys
+from src.utils import bulk_io
+from src.utils.query import QueryError
+
+# Books the subcommand loaded, drained before it exits
+BOOKS = []
+
+def contacts():
+    """The address book, loaded on demand"""
+    from src.address_book import AddressBook
+    BOOKS.append(AddressBook())
+    return BOOKS[-1]
+
+def notes():
+    """The note book, loaded on demand"""
+    from src.note_book import NoteBook
+    BOOKS.append(NoteBook())
+    return BOOKS[-1]
+
+def contact_line(record):
+    return "\t".join([record.name.value, ", ".join(phone.value for phone in record.phones),
+                      ", ".join(email.value for email in record.emails)])
+
+def note_line(record):
+    return "\t".join([record.name.value, " ".join(f"#{tag.value}" for tag in record.tags)])
+
+def birthdays(args):
+    """(rows, lines) of the contacts with a birthday within args.days"""
+    if args.days < 0:
+        raise ValueError("Number of days should be positive")
+    upcoming = contacts().get_birthdays(args.days)
+    rows = [dict(bulk_io.contact_to_row(record), days_left=days_left) for record, days_left in upcoming]
+    lines = [f"{record.name.value}\t{record.birthday.value}\t{days_left}" for record, days_left in upcoming]
+    return rows, lines
+
+def search_contacts(args):
+    return contact_results(contacts().search(args.query, fuzzy=args.fuzzy))
+
+def who_is_calling(args):
+    book = contacts()
+    return contact_results(book.find_by_phone(args.phone) or book.find_by_phone_prefix(args.phone, limit=20))
+
+def query_contacts(args):
+    return contact_results(contacts().query(args.query))
+
+def email_domains(args):
+    domains = sorted(contacts().email_domains(), key=lambda entry: -entry[1])
+    rows = [{"domain": domain, "contacts": count} for domain, count in domains]
+    return rows, [f"{domain}\t{count}" for domain, count in domains]
+
+def search_notes(args):
+    return note_results(notes().search(args.query, args.limit))
+
+def search_by_tag(args):
+    return note_results(notes().search_by_tag(args.tag))
+
+def query_notes(args):
+    return note_results(notes().query(args.query))
+
+def contact_results(records):
+    return [bulk_io.contact_to_row(record) for record in records], [contact_line(record) for record in records]
+
+def note_results(records):
+    return [bulk_io.note_to_row(record) for record in records], [note_line(record) for record in records]
+
+def add_subcommands(parser):
+    """Register the one-shot subcommands on an argparse parser"""
+    subcommands = parser.add_subparsers(dest="subcommand", metavar="COMMAND")
+
+    def add(name, handler, help_text):
+        subcommand = subcommands.add_parser(name, help=help_text, description=help_text)
+        subcommand.add_argument("--json", action="store_true", help="print the results as a JSON array")
+        subcommand.set_defaults(handler=handler)
+        return subcommand
+
+    add("birthdays", birthdays, "contacts with a birthday in the coming days").add_argument(
+        "--days", type=int, default=7, help="number of days to look ahead (7 by default)")
+    subcommand = add("search-contacts", search_contacts, "contacts whose name, phone, email or address contains QUERY")
+    subcommand.add_argument("query")
+    subcommand.add_argument("--fuzzy", action="store_true", help="rank the closest names, for misspelled queries")
+    add("who-is-calling", who_is_calling, "contacts with a phone number (or its beginning)").add_argument("phone")
+    add("query-contacts", query_contacts, "contacts matching a query like email:@acme.com birthday:03-*").add_argument("query")
+    add("email-domains", email_domains, "email domains with the number of contacts at each")
+    subcommand = add("search-notes", search_notes, "notes matching QUERY, best first")
+    subcommand.add_argument("query")
+    subcommand.add_argument("--limit", type=int, help="maximum number of notes")
+    add("search-by-tag", search_by_tag, "notes tagged with TAG").add_argument("tag")
+    add("query-notes", query_notes, "notes matching a query like tag:work content:\"invoice\"").add_argument("query")
+
+def run(args):
+    """Run the subcommand chosen in args, returns the exit status"""
+    try:
+        rows, lines = args.handler(args)
+    except (ValueError, QueryError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        # Also writes the indexes the subcommand built, so the next run does not build them again
+        errors = [error for book in BOOKS for error in book.drain()]
+    for error in errors:
+        print(f"Error saving data: {error}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+    else:
+        for line in lines:
+            print(line)
+    return 0 if rows else 1
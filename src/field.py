@@ -1,12 +1,23 @@
 from datetime import datetime
 import re
-from src.utils.validators import validate_phone, validate_email
+from src.utils.normalization import KEY_MODE, search_key
+from src.utils.validators import validate_phone, validate_email, normalize_phone
 
 class Field:
     """Base class for record fields"""
     def __init__(self, value):
         self.value = value
 
+    @property
+    def key(self):
+        """Normalized value that searches compare, computed once and kept (and stored) with the field"""
+        # Checked against the value too: migrations and old releases assign value directly
+        cached = self.__dict__.get("_key")
+        if cached is None or cached[0] != self.value or cached[1] != KEY_MODE:
+            cached = (self.value, KEY_MODE, search_key(self.value))
+            self._key = cached
+        return cached[2]
+
     def __str__(self):
         return str(self.value)
 
@@ -18,11 +29,11 @@ class Name(Field):
         super().__init__(value)
 
 class Phone(Field):
-    """Phone field for a record"""
+    """Phone field for a record, stored in canonical digits form"""
     def __init__(self, value):
         if not validate_phone(value):
             raise ValueError("Invalid phone number format")
-        super().__init__(value)
+        super().__init__(normalize_phone(value))
 
 class Email(Field):
     """Email field for a record"""
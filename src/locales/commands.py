@@ -0,0 +1,69 @@
+"""
+Command names of every language, keyed by the English command. They are kept
+apart from the language packs so the parser can accept the commands of every
+language while only the pack in use is loaded.
+"""
+COMMANDS = {
+    "en": {
+        "add contact": "add contact",
+        "search contacts": "search contacts",
+        "edit contact": "edit contact",
+        "delete contact": "delete contact",
+        "birthdays": "birthdays",
+        "add note": "add note",
+        "search notes": "search notes",
+        "edit note": "edit note",
+        "delete note": "delete note",
+        "add tag": "add tag",
+        "search by tag": "search by tag",
+        "sort by tags": "sort by tags",
+        "help": "help",
+        "exit": "exit",
+        "change language": "change language",
+        "show all": "show all",
+        "jarvis": "jarvis",
+        "show all notes": "show all notes",
+        "reshard storage": "reshard storage",
+        "storage status": "storage status",
+        "who is calling": "who is calling",
+        "import contacts": "import contacts",
+        "export contacts": "export contacts",
+        "import notes": "import notes",
+        "export notes": "export notes",
+        "query contacts": "query contacts",
+        "query notes": "query notes",
+        "explain query": "explain query",
+        "email domains": "email domains",
+    },
+    "uk": {
+        "add contact": "додати контакт",
+        "search contacts": "пошук контактів",
+        "edit contact": "редагувати контакт",
+        "delete contact": "видалити контакт",
+        "birthdays": "дні народження",
+        "add note": "додати нотатку",
+        "search notes": "пошук нотаток",
+        "edit note": "редагувати нотатку",
+        "delete note": "видалити нотатку",
+        "add tag": "додати тег",
+        "search by tag": "пошук за тегом",
+        "sort by tags": "сортувати за тегами",
+        "help": "допомога",
+        "exit": "вихід",
+        "change language": "змінити мову",
+        "show all": "показати все",
+        "jarvis": "джарвіс",
+        "show all notes": "показати всі нотатки",
+        "reshard storage": "перерозподілити сховище",
+        "storage status": "стан сховища",
+        "who is calling": "хто телефонує",
+        "import contacts": "імпорт контактів",
+        "export contacts": "експорт контактів",
+        "import notes": "імпорт нотаток",
+        "export notes": "експорт нотаток",
+        "query contacts": "запит контактів",
+        "query notes": "запит нотаток",
+        "explain query": "пояснити запит",
+        "email domains": "поштові домени",
+    },
+}
@@ -0,0 +1,122 @@
+"""English translations of the interface strings, keyed by the English command or message id"""
+from src.locales.commands import COMMANDS
+
+TRANSLATIONS = {
+    **COMMANDS["en"],
+    
+    # Command descriptions
+    "desc_add_contact": "Add a new contact",
+    "desc_search_contacts": "Search contacts",
+    "desc_edit_contact": "Edit a contact",
+    "desc_delete_contact": "Delete a contact",
+    "desc_birthdays": "Show upcoming birthdays",
+    "desc_add_note": "Add a new note",
+    "desc_search_notes": "Search notes",
+    "desc_edit_note": "Edit a note",
+    "desc_delete_note": "Delete a note",
+    "desc_add_tag": "Add a tag to a note",
+    "desc_search_by_tag": "Search notes by tag",
+    "desc_sort_by_tags": "Sort notes by tags",
+    "desc_help": "Show available commands",
+    "desc_exit": "Exit the program",
+    "desc_change_language": "Change interface language",
+    "desc_show_all": "Show all contacts",
+    "desc_jarvis": "Toggle J.A.R.V.I.S. mode (Iron Man style assistant)",
+    "desc_show_all_notes": "Show all notes",
+    "desc_reshard_storage": "Redistribute sharded storage over a new number of files",
+    "desc_storage_status": "Show unwritten changes and the last write time",
+    "desc_who_is_calling": "Find a contact by phone number",
+    "desc_import_contacts": "Import contacts from a CSV, JSONL or vCard file",
+    "desc_export_contacts": "Export contacts to a CSV, JSONL or vCard file",
+    "desc_import_notes": "Import notes from a CSV or JSONL file",
+    "desc_export_notes": "Export notes to a CSV or JSONL file",
+    "desc_query_contacts": "Find contacts with a query like email:@acme.com birthday:03-*",
+    "desc_query_notes": "Find notes with a query like tag:work content:\"invoice\" updated:>2026-01-01",
+    "desc_explain_query": "Show which indexes answer a query and how many records it examines",
+    "desc_email_domains": "Show email domains with the number of contacts at each",
+    
+    # Ironman style command descriptions (for Jarvis mode)
+    "jarvis_desc_add_contact": "Create a new human entry in my database. Because you need more friends.",
+    "jarvis_desc_search_contacts": "Initiate reconnaissance protocol for contacting humans.",
+    "jarvis_desc_edit_contact": "Modify human data. People change, my records don't lie.",
+    "jarvis_desc_delete_contact": "Erase human from my memory banks. No hard feelings.",
+    "jarvis_desc_birthdays": "Calculate upcoming human aging milestones. Cake required.",
+    "jarvis_desc_add_note": "Store new data in my neural network. My memory is impeccable.",
+    "jarvis_desc_search_notes": "Scan my memory banks for previously stored information.",
+    "jarvis_desc_edit_note": "Update existing memory files. Even I make mistakes... theoretically.",
+    "jarvis_desc_delete_note": "Permanently erase data from my system. No backups, sir.",
+    "jarvis_desc_add_tag": "Attach metadata label for enhanced categorization protocols.",
+    "jarvis_desc_search_by_tag": "Initiate pattern-matching protocol using metadata tags.",
+    "jarvis_desc_sort_by_tags": "Reorganize memory files by metadata classification.",
+    "jarvis_desc_help": "Display available operational commands. I'm here to assist you, sir.",
+    "jarvis_desc_exit": "Terminate current session. I'll miss you, sir.",
+    "jarvis_desc_change_language": "Reconfigure linguistic parameters. I'm fluent in over 6 million forms of communication.",
+    "jarvis_desc_show_all": "Display all registered humans in database. Your social network is... modest.",
+    "jarvis_desc_jarvis": "Disable J.A.R.V.I.S. mode. But sir, I was just warming up!",
+    "jarvis_desc_show_all_notes": "Display all memory files stored in database. My memory archives are vast.",
+    "jarvis_desc_reshard_storage": "Rebalance my memory banks across storage cells. Housekeeping, sir.",
+    "jarvis_desc_storage_status": "Report on memories still in transit to disk. Nothing is lost on my watch.",
+    "jarvis_desc_who_is_calling": "Caller identification protocol. I'll tell you who's on the line, sir.",
+    "jarvis_desc_import_contacts": "Absorb an entire population of humans at once. Efficiency, sir.",
+    "jarvis_desc_export_contacts": "Transmit your human database to a file. Handle with care.",
+    "jarvis_desc_import_notes": "Upload external memories into my archives in a single pass.",
+    "jarvis_desc_export_notes": "Dump my memory archives to a file. Backups are wise, sir.",
+    "jarvis_desc_query_contacts": "Precision targeting of humans by field. Say the word, sir.",
+    "jarvis_desc_query_notes": "Surgical retrieval from my memory archives, one condition at a time.",
+    "jarvis_desc_explain_query": "Reveal my search strategy. I rarely show my work, sir.",
+    "jarvis_desc_email_domains": "Corporate affiliation census of your humans. Know your allies, sir.",
+    
+    # UI strings
+    "welcome": "Welcome to Personal Assistant!",
+    "enter_command": "Enter a command: ",
+    "exiting": "Exiting...",
+    "error": "Error: {}",
+    "command_not_recognized": "Command not recognized. Type 'help' to see available commands.",
+    "command_not_implemented": "Command not implemented yet.",
+    "available_commands": "Available commands:",
+    "did_you_mean": "Did you mean '{}'? (y/n): ",
+    "goodbye": "Goodbye! Have a nice day!",
+    "language_changed": "Language changed to English.",
+    "select_language": "Select language:\n1. English\n2. Українська\nEnter number: ",
+    "multiple_suggestions": "Did you mean one of these?",
+    "select_suggestion": "Enter number (or press Enter to skip): ",
+    "search_results": "Search results:",
+    "no_results": "No results found.",
+    "search_query": "Enter search query: ",
+    "search_criteria": "Search by:\n1. Name\n2. Phone\n3. Email\n4. Address\nEnter number: ",
+    "tag_search_criteria": "Search by:\n1. Tag name\n2. Note content\nEnter number: ",
+    "sort_criteria": "Sort by:\n1. Name\n2. Date\n3. Tags\nEnter number: ",
+    
+    # Contact management
+    "contact_added": "Contact added successfully.",
+    "contact_deleted": "Contact deleted successfully.",
+    "contact_updated": "Contact updated successfully.",
+    "contact_not_found": "Contact not found.",
+    "enter_name": "Enter name: ",
+    "enter_phone": "Enter phone number: ",
+    "enter_email": "Enter email: ",
+    "enter_birthday": "Enter birthday (YYYY-MM-DD): ",
+    "enter_address": "Enter address: ",
+    "invalid_phone": "Invalid phone number format.",
+    "invalid_email": "Invalid email format.",
+    "invalid_date": "Invalid date format.",
+    "upcoming_birthdays": "Upcoming birthdays in the next {days} days:",
+    "no_birthdays": "No upcoming birthdays.",
+    
+    # Note management
+    "note_added": "Note added successfully.",
+    "note_deleted": "Note deleted successfully.",
+    "note_updated": "Note updated successfully.",
+    "note_not_found": "Note not found.",
+    "enter_note_name": "Enter note name: ",
+    "enter_note_content": "Enter note content: ",
+    "enter_tag": "Enter tag: ",
+    "tag_added": "Tag added successfully.",
+    "no_notes_found": "No notes found.",
+    "notes_by_tag": "Notes by tag:",
+    "no_tags": "Notes without tags:",
+    
+    # Jarvis related strings
+    "jarvis_enabled": "J.A.R.V.I.S. mode enabled. At your service, sir.",
+    "jarvis_disabled": "J.A.R.V.I.S. mode disabled. Returning to normal mode."
+}
@@ -0,0 +1,122 @@
+"""Ukrainian translations of the interface strings, keyed by the English command or message id"""
+from src.locales.commands import COMMANDS
+
+TRANSLATIONS = {
+    **COMMANDS["uk"],
+    
+    # Command descriptions
+    "desc_add_contact": "Додати новий контакт",
+    "desc_search_contacts": "Пошук контактів",
+    "desc_edit_contact": "Редагувати контакт",
+    "desc_delete_contact": "Видалити контакт",
+    "desc_birthdays": "Показати найближчі дні народження",
+    "desc_add_note": "Додати нову нотатку",
+    "desc_search_notes": "Пошук нотаток",
+    "desc_edit_note": "Редагувати нотатку",
+    "desc_delete_note": "Видалити нотатку",
+    "desc_add_tag": "Додати тег до нотатки",
+    "desc_search_by_tag": "Пошук нотаток за тегом",
+    "desc_sort_by_tags": "Сортувати нотатки за тегами",
+    "desc_help": "Показати доступні команди",
+    "desc_exit": "Вийти з програми",
+    "desc_change_language": "Змінити мову інтерфейсу",
+    "desc_show_all": "Показати всі контакти",
+    "desc_jarvis": "Увімкнути режим Д.Ж.А.Р.В.І.С. (асистент у стилі Залізної людини)",
+    "desc_show_all_notes": "Показати всі нотатки",
+    "desc_reshard_storage": "Перерозподілити шардоване сховище на нову кількість файлів",
+    "desc_storage_status": "Показати незаписані зміни та час останнього запису",
+    "desc_who_is_calling": "Знайти контакт за номером телефону",
+    "desc_import_contacts": "Імпортувати контакти з файлу CSV, JSONL або vCard",
+    "desc_export_contacts": "Експортувати контакти у файл CSV, JSONL або vCard",
+    "desc_import_notes": "Імпортувати нотатки з файлу CSV або JSONL",
+    "desc_export_notes": "Експортувати нотатки у файл CSV або JSONL",
+    "desc_query_contacts": "Знайти контакти за запитом на кшталт email:@acme.com birthday:03-*",
+    "desc_query_notes": "Знайти нотатки за запитом на кшталт tag:work content:\"invoice\" updated:>2026-01-01",
+    "desc_explain_query": "Показати, які індекси відповідають на запит і скільки записів він переглядає",
+    "desc_email_domains": "Показати поштові домени та кількість контактів у кожному",
+    
+    # Ironman style command descriptions (for Jarvis mode in Ukrainian)
+    "jarvis_desc_add_contact": "Створити новий запис людини в моїй базі даних. Бо вам потрібно більше друзів.",
+    "jarvis_desc_search_contacts": "Ініціювати протокол розвідки для контакту з людьми.",
+    "jarvis_desc_edit_contact": "Модифікувати дані про людину. Люди змінюються, мої записи не брешуть.",
+    "jarvis_desc_delete_contact": "Стерти людину з моїх банків пам'яті. Без образ.",
+    "jarvis_desc_birthdays": "Розрахувати майбутні віхи старіння людей. Торт обов'язковий.",
+    "jarvis_desc_add_note": "Зберегти нові дані в моїй нейронній мережі. Моя пам'ять бездоганна.",
+    "jarvis_desc_search_notes": "Сканувати мої банки пам'яті на наявність раніше збереженої інформації.",
+    "jarvis_desc_edit_note": "Оновити існуючі файли пам'яті. Навіть я помиляюсь... теоретично.",
+    "jarvis_desc_delete_note": "Назавжди стерти дані з моєї системи. Без резервних копій, сер.",
+    "jarvis_desc_add_tag": "Прикріпити метадані для покращеного протоколу категоризації.",
+    "jarvis_desc_search_by_tag": "Ініціювати протокол пошуку за допомогою метаданих.",
+    "jarvis_desc_sort_by_tags": "Реорганізувати файли пам'яті за класифікацією метаданих.",
+    "jarvis_desc_help": "Відобразити доступні операційні команди. Я тут, щоб допомогти вам, сер.",
+    "jarvis_desc_exit": "Завершити поточний сеанс. Я сумуватиму за вами, сер.",
+    "jarvis_desc_change_language": "Реконфігурувати лінгвістичні параметри. Я вільно володію більш ніж 6 мільйонами форм комунікації.",
+    "jarvis_desc_show_all": "Відобразити всіх зареєстрованих людей в базі даних. Ваша соціальна мережа... скромна.",
+    "jarvis_desc_jarvis": "Вимкнути режим Д.Ж.А.Р.В.І.С. Але сер, я тільки розігрівався!",
+    "jarvis_desc_show_all_notes": "Відобразити всі файли пам'яті, що зберігаються в базі даних. Мої архіви пам'яті неосяжні.",
+    "jarvis_desc_reshard_storage": "Перебалансувати мої банки пам'яті між комірками сховища. Хатні справи, сер.",
+    "jarvis_desc_storage_status": "Звіт про спогади, що ще прямують на диск. Під моїм наглядом нічого не губиться.",
+    "jarvis_desc_who_is_calling": "Протокол ідентифікації абонента. Я скажу, хто на лінії, сер.",
+    "jarvis_desc_import_contacts": "Поглинути цілу популяцію людей за раз. Ефективність, сер.",
+    "jarvis_desc_export_contacts": "Передати вашу базу людей у файл. Обережно з нею.",
+    "jarvis_desc_import_notes": "Завантажити зовнішні спогади до моїх архівів за один прохід.",
+    "jarvis_desc_export_notes": "Вивантажити мої архіви пам'яті у файл. Резервні копії — це мудро, сер.",
+    "jarvis_desc_query_contacts": "Точне наведення на людей за полями. Лише скажіть, сер.",
+    "jarvis_desc_query_notes": "Хірургічне вилучення з моїх архівів пам'яті, умова за умовою.",
+    "jarvis_desc_explain_query": "Розкрити мою стратегію пошуку. Я рідко показую свою роботу, сер.",
+    "jarvis_desc_email_domains": "Перепис корпоративної приналежності ваших людей. Знайте своїх союзників, сер.",
+    
+    # UI strings
+    "welcome": "Ласкаво просимо до Персонального Помічника!",
+    "enter_command": "Введіть команду: ",
+    "exiting": "Виходимо...",
+    "error": "Помилка: {}",
+    "command_not_recognized": "Команда не розпізнана. Введіть 'допомога' для перегляду доступних команд.",
+    "command_not_implemented": "Команда ще не реалізована.",
+    "available_commands": "Доступні команди:",
+    "did_you_mean": "Можливо, ви мали на увазі '{}'? (т/н): ",
+    "goodbye": "До побачення! Гарного дня!",
+    "language_changed": "Мову змінено на українську.",
+    "select_language": "Виберіть мову:\n1. English\n2. Українська\nВведіть номер: ",
+    "multiple_suggestions": "Можливо, ви мали на увазі одну з цих команд?",
+    "select_suggestion": "Введіть номер (або натисніть Enter для пропуску): ",
+    "search_results": "Результати пошуку:",
+    "no_results": "Результатів не знайдено.",
+    "search_query": "Введіть пошуковий запит: ",
+    "search_criteria": "Пошук за:\n1. Ім'я\n2. Телефон\n3. Email\n4. Адреса\nВведіть номер: ",
+    "tag_search_criteria": "Пошук за:\n1. Назва тегу\n2. Вміст нотатки\nВведіть номер: ",
+    "sort_criteria": "Сортувати за:\n1. Ім'я\n2. Дата\n3. Теги\nВведіть номер: ",
+    
+    # Contact management messages
+    "contact_added": "Контакт успішно додано.",
+    "contact_deleted": "Контакт успішно видалено.",
+    "contact_updated": "Контакт успішно оновлено.",
+    "contact_not_found": "Контакт не знайдено.",
+    "enter_name": "Введіть ім'я: ",
+    "enter_phone": "Введіть номер телефону: ",
+    "enter_email": "Введіть email: ",
+    "enter_birthday": "Введіть дату народження (РРРР-ММ-ДД): ",
+    "enter_address": "Введіть адресу: ",
+    "invalid_phone": "Неправильний формат номера телефону.",
+    "invalid_email": "Неправильний формат email.",
+    "invalid_date": "Неправильний формат дати.",
+    "upcoming_birthdays": "Найближчі дні народження протягом {days} днів:",
+    "no_birthdays": "Немає найближчих днів народження.",
+    
+    # Note management messages
+    "note_added": "Нотатку успішно додано.",
+    "note_deleted": "Нотатку успішно видалено.",
+    "note_updated": "Нотатку успішно оновлено.",
+    "note_not_found": "Нотатку не знайдено.",
+    "enter_note_name": "Введіть назву нотатки: ",
+    "enter_note_content": "Введіть вміст нотатки: ",
+    "enter_tag": "Введіть тег: ",
+    "tag_added": "Тег успішно додано.",
+    "no_notes_found": "Нотаток не знайдено.",
+    "notes_by_tag": "Нотатки за тегом:",
+    "no_tags": "Нотатки без тегів:",
+    
+    # Jarvis related strings
+    "jarvis_enabled": "Режим Д.Ж.А.Р.В.І.С. увімкнено. До ваших послуг, сер.",
+    "jarvis_disabled": "Режим Д.Ж.А.Р.В.І.С. вимкнено. Повернення до звичайного режиму."
+}
@@ -0,0 +1,73 @@
+"""
+Versioned migrations of stored records.
+
+Every stored book is stamped with the schema version of its records. Books
+written before versioning count as version 0. A migration to version N takes
+one record of version N - 1 and returns it upgraded (or the same object if
+there is nothing to change).
+"""
+from src.record import ContactRecord, NoteRecord
+from src.utils.validators import normalize_phone
+
+SCHEMA_VERSION = 2
+
+def contact_v1(record):
+    """Turn a plain Record from the first releases into a ContactRecord"""
+    if hasattr(record, 'phones') and hasattr(record, 'emails'):
+        return record
+
+    new_record = ContactRecord(record.name.value)
+    # Copy any available attributes
+    if hasattr(record, 'birthday'):
+        new_record.birthday = record.birthday
+    if hasattr(record, 'address'):
+        new_record.address = record.address
+    if hasattr(record, 'created_at'):
+        new_record.created_at = record.created_at
+    if hasattr(record, 'updated_at'):
+        new_record.updated_at = record.updated_at
+    return new_record
+
+def note_v1(record):
+    """Turn a plain Record from the first releases into a NoteRecord"""
+    if hasattr(record, 'content') and hasattr(record, 'tags'):
+        return record
+
+    new_record = NoteRecord(record.name.value, getattr(record, 'content', ""))
+    if hasattr(record, 'created_at'):
+        new_record.created_at = record.created_at
+    if hasattr(record, 'updated_at'):
+        new_record.updated_at = record.updated_at
+    return new_record
+
+def contact_v2(record):
+    """Store phone numbers in canonical digits form"""
+    for phone in record.phones:
+        phone.value = normalize_phone(phone.value)
+    return record
+
+# Book kind -> {version: migration to that version}
+MIGRATIONS = {
+    "contacts": {1: contact_v1, 2: contact_v2},
+    "notes": {1: note_v1},
+}
+
+def migrate(data, kind, version):
+    """
+    Upgrade the records of a book stored at schema version to SCHEMA_VERSION.
+    Records are replaced one at a time in place. Returns True if the book was
+    behind and has to be saved to record the new version.
+    """
+    if version >= SCHEMA_VERSION:
+        return False
+
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        step = MIGRATIONS[kind].get(target)
+        if step is None:
+            continue
+        # Replacing the value of an existing key is safe while iterating
+        for key, record in data.items():
+            upgraded = step(record)
+            if upgraded is not record:
+                data[key] = upgraded
+    return True
@@ -1,76 +1,244 @@
+import os
 from collections import UserDict
-from src.record import NoteRecord
-from src.utils.storage import Storage
+from bisect import bisect_left
+from src.migrations import SCHEMA_VERSION, migrate
+from src.utils import bulk_io
+from src.utils.index_file import load_indexes, save_indexes
+from src.utils.normalization import search_key
+from src.utils.query import Condition, Plan, check_field, dated_condition, name_condition
+from src.utils.sorted_index import SortedIndex
+from src.utils.tag_index import TagIndex
+from src.utils.text_index import TextIndex, matches
+from src.utils.storage import Storage, DEFAULT_BOOK_BACKEND, DEFAULT_RECORD_FORMAT, BACKGROUND_WRITES, NOTES_COMPRESSION
 from io import StringIO
 
+# Fields of notes in structured queries
+QUERY_FIELDS = {"text", "name", "title", "content", "tag", "created", "updated"}
+
 class NoteBook(UserDict):
     """Class for storing and managing notes"""
     def __init__(self):
         super().__init__()
-        self.storage = Storage("note_book.pickle")
+        # Search keys of the names in sorted order, built from the keys on first use
+        self.name_index = None
+        self.storage = Storage("note_book.pickle", journal=True, backend=DEFAULT_BOOK_BACKEND, kind="notes",
+                               write_behind=True, record_format=DEFAULT_RECORD_FORMAT,
+                               codec=NOTES_COMPRESSION, background=BACKGROUND_WRITES,
+                               schema=SCHEMA_VERSION)
         # Load data from storage if available
         data = self.storage.load()
-        if data:
+        if data is not None:
             self.data = data
-            # Migrate old records if needed
-            self._migrate_records()
-    
-    def _migrate_records(self):
-        """Migrate old Record objects to NoteRecord"""
-        migrated = False
-        for name, record in list(self.data.items()):
-            # Check if record is not a NoteRecord
-            if not hasattr(record, 'content') or not hasattr(record, 'tags'):
-                # Create a new NoteRecord with default content
-                new_record = NoteRecord(record.name.value, getattr(record, 'content', ""))
-                # Copy any available attributes
-                if hasattr(record, 'created_at'):
-                    new_record.created_at = record.created_at
-                if hasattr(record, 'updated_at'):
-                    new_record.updated_at = record.updated_at
-                
-                # Replace old record with new one
-                self.data[name] = new_record
-                migrated = True
+            # Upgrade records stamped with an older schema; nothing to scan when it is current
+            schema = self.storage.backend.loaded_schema
+            if schema is not None and migrate(self.data, "notes", schema):
+                self.save()
         
-        # Save changes if any records were migrated
-        if migrated:
-            self.save()
+        # Full-text and tag indexes saved by the last drain, trusted only while they cover exactly the stored notes
+        self.index_path = os.path.join(self.storage.data_folder, "note_book.indexes")
+        saved = load_indexes(self.index_path)
+        names = set(self.data) if saved else None
+        self.search_index = self._covering(saved.get("search"), names)
+        self.tag_index = self._covering(saved.get("tags"), names)
+        # The file exists only while it matches the indexes: the first change removes it,
+        # so a session that ends without a drain leaves no stale index behind
+        self.indexes_saved = os.path.exists(self.index_path)
+        if not self._indexes():
+            self._discard_saved_indexes()
     
     def add_record(self, record):
         """Add a new note record to the note book"""
+        self._index_name(record.name.value)
+        self._index_note(record)
         self.data[record.name.value] = record
-        self.save()
+        self.storage.apply({record.name.value: record}, self.data)
         return True
     
     def find(self, name):
-        """Find a note by name"""
-        return self.data.get(name)
+        """Find a note by name, ignoring case when no name matches exactly and only one does otherwise"""
+        record = self.data.get(name)
+        if record is None:
+            matches = self.find_all(name)
+            record = matches[0] if len(matches) == 1 else None
+        if record is not None:
+            # Edits made to the note keep the indexes current
+            record._observer = self._record_changed
+        return record
+    
+    def find_all(self, name):
+        """Notes whose name equals name ignoring case"""
+        # The index holds search keys, which also match transliterated names
+        folded = name.casefold()
+        return [self.data[key] for key in self._names().find(search_key(name)) if key.casefold() == folded]
+    
+    def find_by_prefix(self, prefix, limit=None):
+        """Notes whose name starts with prefix as a search key, in name order"""
+        return [self.data[key] for key in self._names().prefix(search_key(prefix), limit)]
+    
+    def _names(self):
+        """Name index, built on first use"""
+        if self.name_index is None:
+            # Keys only, so lazily loaded records stay on disk
+            self.name_index = SortedIndex((name, [search_key(name)]) for name in self.data)
+        return self.name_index
+    
+    def _index_name(self, name):
+        """Add a name to the name index if it is built"""
+        if self.name_index is not None:
+            self.name_index.add(name, [search_key(name)])
     
     def delete(self, name):
         """Delete a note by name"""
         if name in self.data:
             del self.data[name]
-            self.save()
+            if self.name_index is not None:
+                self.name_index.remove(name)
+            self._unindex_note(name)
+            self.storage.apply({name: None}, self.data)
             return True
         return False
     
-    def search(self, query):
-        """Search notes by content"""
-        query = query.lower()
-        results = []
-        
+    def update_record(self, record, old_name=None):
+        """Persist changes made to a record, moving it to its new key if it was renamed"""
+        changes = {}
+        if old_name is not None and old_name != record.name.value:
+            self.data.pop(old_name, None)
+            if self.name_index is not None:
+                self.name_index.remove(old_name)
+            self._unindex_note(old_name)
+            changes[old_name] = None
+        self._index_name(record.name.value)
+        self.data[record.name.value] = record
+        changes[record.name.value] = record
+        # Fields may have been assigned directly, bypassing the record's change notification
+        self._index_note(record)
+        return self.storage.apply(changes, self.data)
+    
+    def search(self, query, limit=None):
+        """
+        Search notes by title and content, best matches first. Every word of the
+        query has to start a word of the note, "quoted phrases" have to occur as
+        they are; limit caps the number of results.
+        """
+        return [self.data[name] for name, _ in self._search_index().search(query, limit)]
+    
+    def query(self, text):
+        """Notes matching a structured query such as 'tag:work content:"invoice" updated:>2026-01-01'"""
+        return Plan(self, text).execute()
+    
+    def explain(self, text):
+        """(matching notes, lines describing the plan that found them) for a structured query"""
+        plan = Plan(self, text)
+        results = plan.execute()
+        return results, plan.explain()
+    
+    def condition(self, term):
+        """Query condition of one term of a structured query"""
+        field = check_field(term, QUERY_FIELDS)
+        if field in ("text", "content"):
+            # Words match as in search; a quoted value is a phrase
+            query = f'"{term.value}"' if term.quoted else term.value
+            texts = self._search_texts if field == "text" else lambda record: [record.content]
+            return Condition(term, lambda record: matches(texts(record), query),
+                             lambda: [name for name, _ in self._search_index().search(query)], "full-text index")
+        if field in ("name", "title"):
+            return name_condition(self, term)
+        if field == "tag":
+            tag = search_key(term.value.lstrip("#"))
+            return Condition(term, lambda record: any(value.key == tag for value in record.tags),
+                             lambda: self._tags().find(tag), "tag index")
+        return dated_condition(term, f"{field}_at")
+    
+    def _search_index(self):
+        """Full-text index, built on first use"""
+        if self.search_index is None:
+            self.rebuild_search_index()
+        return self.search_index
+    
+    def _tags(self):
+        """Tag index, built on first use"""
+        if self.tag_index is None:
+            self.rebuild_tag_index()
+        return self.tag_index
+    
+    def rebuild_search_index(self):
+        """Build the full-text index from all stored notes"""
+        self.search_index = self._build(TextIndex(), self._search_texts)
+    
+    def rebuild_tag_index(self):
+        """Build the tag index from all stored notes"""
+        self.tag_index = self._build(TagIndex(), self._tag_values)
+    
+    def _build(self, index, values):
+        """Fill a new index with all stored notes"""
         for record in self.data.values():
-            # Search in name
-            if query in record.name.value.lower():
-                results.append(record)
-                continue
-            
-            # Search in content
-            if query in record.content.lower():
-                results.append(record)
-        
-        return results
+            record._observer = self._record_changed
+            index.add(record.name.value, values(record))
+        # The saved file does not hold this index yet
+        self._discard_saved_indexes()
+        return index
+    
+    def save_indexes(self):
+        """Write the full-text and tag indexes to disk if they changed since they were last written"""
+        indexes = {name: index for name, index in (("search", self.search_index), ("tags", self.tag_index))
+                   if index is not None}
+        if not indexes or self.indexes_saved:
+            return True
+        self.indexes_saved = save_indexes(self.index_path, indexes)
+        return self.indexes_saved
+    
+    @staticmethod
+    def _covering(index, names):
+        """index if it holds exactly the notes named names, else None"""
+        return index if index is not None and set(index.keys()) == names else None
+    
+    @staticmethod
+    def _search_texts(record):
+        """Texts of a note that are searched"""
+        return [record.name.value, record.content]
+    
+    @staticmethod
+    def _tag_values(record):
+        """Tags of a note"""
+        return [tag.value for tag in record.tags]
+    
+    def _indexes(self):
+        """(index, function giving what a note is indexed under) for every index built so far"""
+        indexes = ((self.search_index, self._search_texts), (self.tag_index, self._tag_values))
+        return [(index, values) for index, values in indexes if index is not None]
+    
+    def _index_note(self, record):
+        """(Re)index a note in the indexes built so far and follow its later changes"""
+        indexes = self._indexes()
+        if indexes:
+            record._observer = self._record_changed
+            for index, values in indexes:
+                index.add(record.name.value, values(record))
+            self._discard_saved_indexes()
+    
+    def _unindex_note(self, name):
+        """Drop a note from the indexes"""
+        indexes = self._indexes()
+        for index, _ in indexes:
+            index.remove(name)
+        if indexes:
+            self._discard_saved_indexes()
+    
+    def _record_changed(self, record):
+        """Reindex a note after one of its mutators ran"""
+        # A deleted note is no longer indexed; a renamed one is moved by update_record
+        if any(record.name.value in index for index, _ in self._indexes()):
+            self._index_note(record)
+    
+    def _discard_saved_indexes(self):
+        """Remove the saved indexes once they no longer match the notes"""
+        if not self.indexes_saved:
+            return
+        self.indexes_saved = False
+        try:
+            os.remove(self.index_path)
+        except OSError as e:
+            print(f"Error removing indexes: {e}")
     
     def search_by_tag(self, tag):
         """Search notes by tag"""
@@ -78,47 +246,82 @@ class NoteBook(UserDict):
         if tag.startswith('#'):
             tag = tag[1:]
             
-        tag = tag.lower()
-        results = []
+        tag = search_key(tag)
         
-        for record in self.data.values():
-            for note_tag in record.tags:
-                if tag == note_tag.value.lower():
-                    results.append(record)
-                    break
+        # Let the storage backend answer from its tag index when it can
+        names = self.storage.backend.search_by_tag(tag)
+        if names is not None:
+            return [self.data[name] for name in names]
         
-        return results
+        return [self.data[name] for name in self._tags().find(tag)]
     
     def sort_by_tags(self):
         """Sort all notes by tags alphabetically and group them by tag"""
         if not self.data:
             return {}
-            
-        # Create a dictionary to store notes grouped by tags
-        result = {}
         
-        # Group notes by tags
-        for record in self.data.values():
-            if record.tags:
-                for tag in record.tags:
-                    tag_value = tag.value.lower()
-                    if tag_value not in result:
-                        result[tag_value] = []
-                    if record not in result[tag_value]:
-                        result[tag_value].append(record)
+        # The index keeps its tags sorted; notes without tags are grouped under a special key in between
+        tag_index = self._tags()
+        groups = tag_index.groups()
+        if tag_index.untagged:
+            position = bisect_left(tag_index.order, "no_tags")
+            groups.insert(position, ("no_tags", list(tag_index.untagged)))
+        return {tag: [self.data[name] for name in names] for tag, names in groups}
+    
+    def import_file(self, path, file_format=None, stage=False):
+        """
+        Stream notes from a CSV or JSONL file into the book and save them as one batch.
+        With stage, they wait with the other pending changes for the next flush instead.
+        Returns the number of imported notes and the errors of the rows that were skipped.
+        """
+        errors = []
+        # Staged until the whole file is read, so a file that fails midway imports nothing
+        staged = {}
+        count = 0
+        for record in bulk_io.read_records(path, "notes", file_format, errors):
+            staged[record.name.value] = record
+            count += 1
+        self.data.update(staged)
+        if count:
+            # Rebuilt on the next lookup rather than maintained row by row
+            self.name_index = None
+            self.search_index = None
+            self.tag_index = None
+            self._discard_saved_indexes()
+            if stage:
+                self.storage.apply(staged, self.data)
             else:
-                # Group notes without tags under a special key
-                if "no_tags" not in result:
-                    result["no_tags"] = []
-                result["no_tags"].append(record)
-        
-        # Sort the dictionary by tag keys
-        return dict(sorted(result.items()))
+                self.save()
+        return count, errors
+    
+    def export_file(self, path, file_format=None):
+        """Write all notes to a CSV or JSONL file, returns how many were written"""
+        return bulk_io.write_records(path, "notes", self.data.values(), file_format)
     
     def save(self):
         """Save note book to storage"""
         return self.storage.save(self.data)
     
+    def flush(self):
+        """Write changes made since the last flush to storage"""
+        return self.storage.flush()
+    
+    def drain(self):
+        """Write every pending change and the indexes and wait for the disk, returns the errors hit"""
+        errors = list(self.storage.drain())
+        # Indexes of notes that never reached the disk would be trusted on the next start
+        if not errors and not self.save_indexes():
+            errors.append("note_book.indexes: write failed")
+        return errors
+    
+    def storage_status(self):
+        """Pending changes, queued writes and last write latency of the note book storage"""
+        return self.storage.status()
+    
+    def reshard(self, count):
+        """Split the note book over count shard files (sharded storage only)"""
+        return self.storage.reshard(count, self.data)
+    
     def __str__(self):
         """String representation of the note book"""
         output = StringIO()
@@ -1,14 +1,42 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from src.field import Name, Phone, Email, Address, Birthday, Tag
+from src.utils.validators import normalize_phone
 from io import StringIO
 
+def birthday_in_year(birthday, year):
+    """Date a birthday falls on in year (February 29 becomes February 28 outside leap years)"""
+    try:
+        return birthday.replace(year=year)
+    except ValueError:
+        return date(year, 2, 28)
+
 class Record:
     """Base class for records in address book and note book"""
+    # Called with the record after every change, e.g. by a book keeping its search index current
+    _observer = None
+
     def __init__(self, name):
         self.name = Name(name)
         self.created_at = datetime.now()
         self.updated_at = self.created_at
 
+    def _changed(self):
+        """Mark the record as updated and notify the observer"""
+        self.updated_at = datetime.now()
+        if self._observer is not None:
+            self._observer(self)
+
+    def edit_name(self, new_name):
+        """Edit the name of the record"""
+        self.name = Name(new_name)
+        self._changed()
+
+    def __getstate__(self):
+        # The observer belongs to the book holding the record, not to the stored record
+        state = self.__dict__.copy()
+        state.pop("_observer", None)
+        return state
+
     def __str__(self):
         return f"Record: {self.name}"
 
@@ -24,37 +52,39 @@ class ContactRecord(Record):
     def add_phone(self, phone):
         """Add a phone number to the contact"""
         self.phones.append(Phone(phone))
-        self.updated_at = datetime.now()
+        self._changed()
 
     def remove_phone(self, phone):
         """Remove a phone number from the contact"""
+        phone = normalize_phone(phone)
         for i, p in enumerate(self.phones):
             if p.value == phone:
                 self.phones.pop(i)
-                self.updated_at = datetime.now()
+                self._changed()
                 return True
         return False
 
     def edit_phone(self, old_phone, new_phone):
         """Edit a phone number"""
+        old_phone = normalize_phone(old_phone)
         for i, p in enumerate(self.phones):
             if p.value == old_phone:
                 self.phones[i] = Phone(new_phone)
-                self.updated_at = datetime.now()
+                self._changed()
                 return True
         return False
 
     def add_email(self, email):
         """Add an email to the contact"""
         self.emails.append(Email(email))
-        self.updated_at = datetime.now()
+        self._changed()
 
     def remove_email(self, email):
         """Remove an email from the contact"""
         for i, e in enumerate(self.emails):
             if e.value == email:
                 self.emails.pop(i)
-                self.updated_at = datetime.now()
+                self._changed()
                 return True
         return False
 
@@ -63,39 +93,34 @@ class ContactRecord(Record):
         for i, e in enumerate(self.emails):
             if e.value == old_email:
                 self.emails[i] = Email(new_email)
-                self.updated_at = datetime.now()
+                self._changed()
                 return True
         return False
 
     def set_address(self, address):
         """Set the address for the contact"""
         self.address = Address(address)
-        self.updated_at = datetime.now()
+        self._changed()
 
     def set_birthday(self, birthday):
         """Set the birthday for the contact"""
         self.birthday = Birthday(birthday)
-        self.updated_at = datetime.now()
+        self._changed()
         
-    def edit_name(self, new_name):
-        """Edit the name of the contact"""
-        self.name = Name(new_name)
-        self.updated_at = datetime.now()
-
-    def days_to_birthday(self):
-        """Calculate days to the next birthday"""
+    def days_to_birthday(self, today=None):
+        """Calculate days to the next birthday (counted from today unless another date is given)"""
         if not self.birthday:
             return None
 
-        today = datetime.now().date()
+        today = today or datetime.now().date()
         birthday = self.birthday.date
 
         # Set the birthday for this year
-        birthday_this_year = birthday.replace(year=today.year)
+        birthday_this_year = birthday_in_year(birthday, today.year)
 
         # If the birthday has already occurred this year, calculate for next year
         if birthday_this_year < today:
-            birthday_this_year = birthday_this_year.replace(year=today.year + 1)
+            birthday_this_year = birthday_in_year(birthday, today.year + 1)
 
         # Calculate the difference in days
         days_remaining = (birthday_this_year - today).days
@@ -146,7 +171,7 @@ class NoteRecord(Record):
                 return False
         
         self.tags.append(Tag(tag))
-        self.updated_at = datetime.now()
+        self._changed()
         return True
 
     def remove_tag(self, tag):
@@ -158,14 +183,14 @@ class NoteRecord(Record):
         for i, t in enumerate(self.tags):
             if t.value.lower() == tag.lower():
                 self.tags.pop(i)
-                self.updated_at = datetime.now()
+                self._changed()
                 return True
         return False
 
     def edit_content(self, new_content):
         """Edit the content of the note"""
         self.content = new_content
-        self.updated_at = datetime.now()
+        self._changed()
 
     def __str__(self):
         output = StringIO()
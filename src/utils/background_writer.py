@@ -0,0 +1,63 @@
+import queue
+import threading
+
+class BackgroundWriter:
+    """
+    Runs write tasks one at a time on a daemon thread.
+    The queue is bounded, so a caller that outpaces the disk waits in submit()
+    instead of piling up snapshots in memory.
+    """
+    def __init__(self, name, max_pending):
+        self.queue = queue.Queue(max_pending)
+        self.lock = threading.Lock()
+        self.errors = []
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, task, *args):
+        """Queue task(*args); a task reports failure by returning False or raising"""
+        self.queue.put((task, args))
+
+    def pending(self):
+        """Number of queued or running tasks"""
+        return self.queue.unfinished_tasks
+
+    def wait(self):
+        """Wait for every queued task"""
+        self.queue.join()
+
+    def drain(self):
+        """Wait for every queued task, returns (and forgets) the errors they hit"""
+        self.wait()
+        with self.lock:
+            errors, self.errors = self.errors, []
+        return errors
+
+    def stop(self):
+        """Drain the queue and end the thread, returns the errors"""
+        errors = self.drain()
+        self.queue.put(None)
+        self.thread.join()
+        return errors
+
+    def _run(self):
+        """Writer thread loop"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+
+            task, args = item
+            try:
+                if task(*args) is False:
+                    self._error(f"{self.thread.name}: write failed")
+            except Exception as e:
+                self._error(f"{self.thread.name}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _error(self, message):
+        """Remember an error for the next drain"""
+        with self.lock:
+            self.errors.append(message)
@@ -0,0 +1,68 @@
+import calendar
+from datetime import timedelta
+
+class BirthdayIndex:
+    """
+    Calendar of birthdays: one bucket per (month, day), 366 at most.
+    A window of N days touches at most N + 1 buckets however large the book
+    is. Birthdays on February 29 are celebrated on February 28 in other years.
+    """
+    def __init__(self):
+        # (month, day) -> records born on that day, as dict keys to keep them in insertion (book) order
+        self.buckets = {}
+        # record -> its (month, day)
+        self.items = {}
+
+    def add(self, record, birthday):
+        """Index record under its birthday date (None drops it from the index)"""
+        self.remove(record)
+        if birthday is None:
+            return
+        key = (birthday.month, birthday.day)
+        self.buckets.setdefault(key, {})[record] = None
+        self.items[record] = key
+
+    def remove(self, record):
+        """Drop record from the index"""
+        key = self.items.pop(record, None)
+        if key is not None:
+            bucket = self.buckets[key]
+            bucket.pop(record, None)
+            if not bucket:
+                del self.buckets[key]
+
+    def on(self, day):
+        """Records whose birthday is celebrated on the date day"""
+        records = list(self.buckets.get((day.month, day.day), ()))
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            records.extend(self.buckets.get((2, 29), ()))
+        return records
+
+    def upcoming(self, start, days):
+        """(record, days from start) for birthdays within days after the start date, soonest first"""
+        result = []
+        seen = set()
+        # Within a year every bucket comes up; later dates would only repeat them
+        for offset in range(min(days, 365) + 1):
+            day = start + timedelta(days=offset)
+            for record in self.on(day):
+                if record not in seen:
+                    seen.add(record)
+                    result.append((record, offset))
+        return result
+
+    def in_range(self, first, last):
+        """Records born between the (month, day) pairs first and last, inclusive; the range may wrap over New Year"""
+        if first <= last:
+            keys = [key for key in self.buckets if first <= key <= last]
+        else:
+            keys = [key for key in self.buckets if key >= first or key <= last]
+        keys.sort(key=lambda key: (key < first, key))
+        return [record for key in keys for record in self.buckets[key]]
+
+    def in_month(self, month):
+        """Records born in month, by day"""
+        return self.in_range((month, 1), (month, 31))
+
+    def __contains__(self, record):
+        return record in self.items
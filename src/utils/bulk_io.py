@@ -0,0 +1,225 @@
+"""
+Streaming import and export of contacts and notes.
+
+Readers yield one record at a time and writers consume any iterable of
+records, so files of any size are processed in constant memory. Supported
+formats: CSV and JSONL for both books, vCard for contacts. Lists (phones,
+emails, tags) are separated by ";" in CSV and are arrays in JSONL.
+"""
+import csv
+import json
+import os
+import re
+from datetime import datetime
+from src.record import ContactRecord, NoteRecord
+
+CONTACT_COLUMNS = ["name", "phones", "emails", "address", "birthday", "created_at", "updated_at"]
+NOTE_COLUMNS = ["name", "content", "tags", "created_at", "updated_at"]
+
+EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".vcf": "vcard", ".vcard": "vcard"}
+
+class RowError(ValueError):
+    """A row that could not be turned into a record"""
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+def detect_format(path, file_format=None):
+    """File format from the explicit choice or the file extension"""
+    file_format = file_format or EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if file_format not in ("csv", "jsonl", "vcard"):
+        raise ValueError(f"Unknown file format: {file_format or path}")
+    return file_format
+
+def _split(value):
+    """List field of a CSV cell or a JSON value"""
+    if isinstance(value, list):
+        return [item.strip() for item in value if item and item.strip()]
+    return [item.strip() for item in (value or "").split(";") if item.strip()]
+
+def _timestamps(record, row):
+    """Copy created_at/updated_at from a row when present"""
+    if row.get("created_at"):
+        record.created_at = datetime.fromisoformat(row["created_at"])
+        record.updated_at = record.created_at
+    if row.get("updated_at"):
+        record.updated_at = datetime.fromisoformat(row["updated_at"])
+
+def contact_from_row(row):
+    """Build a ContactRecord from a dict of CONTACT_COLUMNS; fields are validated as on input"""
+    record = ContactRecord((row.get("name") or "").strip())
+    for phone in _split(row.get("phones")):
+        record.add_phone(phone)
+    for email in _split(row.get("emails")):
+        record.add_email(email)
+    if row.get("address"):
+        record.set_address(row["address"].strip())
+    if row.get("birthday"):
+        record.set_birthday(row["birthday"].strip())
+    _timestamps(record, row)
+    return record
+
+def note_from_row(row):
+    """Build a NoteRecord from a dict of NOTE_COLUMNS"""
+    record = NoteRecord((row.get("name") or "").strip(), row.get("content") or "")
+    for tag in _split(row.get("tags")):
+        record.add_tag(tag)
+    _timestamps(record, row)
+    return record
+
+def contact_to_row(record):
+    """Dict of CONTACT_COLUMNS for a ContactRecord"""
+    return {
+        "name": record.name.value,
+        "phones": [phone.value for phone in record.phones],
+        "emails": [email.value for email in record.emails],
+        "address": record.address.value if record.address else "",
+        "birthday": record.birthday.value if record.birthday else "",
+        "created_at": record.created_at.isoformat(),
+        "updated_at": record.updated_at.isoformat(),
+    }
+
+def note_to_row(record):
+    """Dict of NOTE_COLUMNS for a NoteRecord"""
+    return {
+        "name": record.name.value,
+        "content": record.content,
+        "tags": [tag.value for tag in record.tags],
+        "created_at": record.created_at.isoformat(),
+        "updated_at": record.updated_at.isoformat(),
+    }
+
+def _read_csv(file):
+    """(line, row) pairs of a CSV file with a header"""
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+def _read_jsonl(file):
+    """(line, text) pairs of a JSON Lines file; each text is parsed with the row's other checks"""
+    for line, text in enumerate(file, 1):
+        if text.strip():
+            yield line, text
+
+def _read_vcard(file):
+    """(line, row) pairs of a vCard file, one per BEGIN:VCARD ... END:VCARD block"""
+    row, start, pending = None, 0, None
+    for line, text in enumerate(file, 1):
+        text = text.rstrip("\r\n")
+        # Folded lines continue the previous one after a space or tab
+        if text[:1] in (" ", "\t") and pending is not None:
+            pending += text[1:]
+            continue
+        if pending is not None and row is not None:
+            _vcard_property(row, pending)
+        pending = None
+
+        upper = text.upper()
+        if upper == "BEGIN:VCARD":
+            row, start = {"phones": [], "emails": []}, line
+        elif upper == "END:VCARD" and row is not None:
+            yield start, row
+            row = None
+        elif row is not None and ":" in text:
+            pending = text
+
+def _vcard_property(row, text):
+    """Store one vCard property line in a contact row"""
+    key, raw = text.split(":", 1)
+    name = key.split(";", 1)[0].upper()
+    # Grouped properties look like item1.TEL
+    name = name.rsplit(".", 1)[-1]
+    # Structured values (N, ADR) separate their components with unescaped ";"
+    parts = [_unescape_vcard(part) for part in re.split(r"(?<!\\);", raw)]
+    value = _unescape_vcard(raw)
+
+    if name == "FN":
+        row["name"] = value
+    elif name == "N" and not row.get("name"):
+        # Family name first, then the given name
+        row["name"] = " ".join(part for part in reversed(parts[:2]) if part)
+    elif name == "TEL":
+        row["phones"].append(value)
+    elif name == "EMAIL":
+        row["emails"].append(value)
+    elif name == "ADR":
+        row["address"] = ", ".join(part for part in parts if part)
+    elif name == "BDAY":
+        digits = value.replace("-", "")[:8]
+        row["birthday"] = f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}" if len(digits) == 8 else value
+
+READERS = {"csv": _read_csv, "jsonl": _read_jsonl, "vcard": _read_vcard}
+
+# Turn what a reader yields into a row, for formats that are not parsed by the reader
+PARSERS = {"jsonl": json.loads}
+
+def read_records(path, kind, file_format=None, errors=None):
+    """
+    Yield the records of a file one by one.
+    Rows that fail validation are skipped and, if errors is a list, a
+    RowError describing them is appended to it.
+    """
+    file_format = detect_format(path, file_format)
+    if file_format == "vcard" and kind != "contacts":
+        raise ValueError("vCard files can only hold contacts")
+    build = contact_from_row if kind == "contacts" else note_from_row
+    parse = PARSERS.get(file_format)
+
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        for line, row in READERS[file_format](file):
+            try:
+                # A malformed line is skipped like any other invalid row
+                if parse is not None:
+                    row = parse(row)
+                record = build(row)
+            except (ValueError, TypeError, AttributeError) as e:
+                if errors is not None:
+                    errors.append(RowError(line, e))
+                continue
+            yield record
+
+def _unescape_vcard(value):
+    """Value of an escaped vCard text"""
+    return re.sub(r"\\(.)", lambda match: " " if match.group(1) in "nN" else match.group(1), value).strip()
+
+def _escape_vcard(value):
+    """Escape a vCard property value"""
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;").replace("\n", "\\n")
+
+def _write_vcard(file, record):
+    """Write one contact as a vCard 3.0 block"""
+    file.write("BEGIN:VCARD\r\nVERSION:3.0\r\n")
+    file.write(f"FN:{_escape_vcard(record.name.value)}\r\n")
+    for phone in record.phones:
+        file.write(f"TEL:{_escape_vcard(phone.value)}\r\n")
+    for email in record.emails:
+        file.write(f"EMAIL:{_escape_vcard(email.value)}\r\n")
+    if record.address:
+        file.write(f"ADR:;;{_escape_vcard(record.address.value)};;;;\r\n")
+    if record.birthday:
+        file.write(f"BDAY:{record.birthday.date.isoformat()}\r\n")
+    file.write("END:VCARD\r\n")
+
+def write_records(path, kind, records, file_format=None):
+    """Write records to a file as they are iterated, returns how many were written"""
+    file_format = detect_format(path, file_format)
+    if file_format == "vcard" and kind != "contacts":
+        raise ValueError("vCard files can only hold contacts")
+    columns, to_row = (CONTACT_COLUMNS, contact_to_row) if kind == "contacts" else (NOTE_COLUMNS, note_to_row)
+
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        if file_format == "csv":
+            writer = csv.DictWriter(file, columns)
+            writer.writeheader()
+        for record in records:
+            if file_format == "csv":
+                row = to_row(record)
+                writer.writerow({key: ";".join(value) if isinstance(value, list) else value
+                                 for key, value in row.items()})
+            elif file_format == "jsonl":
+                file.write(json.dumps(to_row(record), ensure_ascii=False) + "\n")
+            else:
+                _write_vcard(file, record)
+            count += 1
+    return count
@@ -0,0 +1,45 @@
+"""
+Optional compression of stored book files.
+
+A compressed file starts with MAGIC and one byte naming the codec, followed
+by the compressed contents. Files without the header are read as they are,
+so uncompressed files (and files written before compression existed) load
+unchanged.
+"""
+import bz2
+import lzma
+import zlib
+
+MAGIC = b"PACMP"
+
+# Codec name -> (id stored in the header, compress, decompress)
+CODECS = {
+    "none": (0, None, None),
+    "zlib": (1, zlib.compress, zlib.decompress),
+    "lzma": (2, lzma.compress, lzma.decompress),
+    "bz2": (3, bz2.compress, bz2.decompress),
+}
+CODEC_NAMES = {codec_id: name for name, (codec_id, _, _) in CODECS.items()}
+
+def check_codec(codec):
+    """Raise ValueError for a codec name that is not supported"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+
+def compress(payload, codec="none"):
+    """Compress payload with codec, adding the header (no header for "none")"""
+    check_codec(codec)
+    codec_id, compressor, _ = CODECS[codec]
+    if compressor is None:
+        return payload
+    return MAGIC + bytes([codec_id]) + compressor(payload)
+
+def decompress(blob):
+    """Contents of a blob written by compress with any codec"""
+    if blob[:len(MAGIC)] != MAGIC:
+        return blob
+    codec_id = blob[len(MAGIC)]
+    if codec_id not in CODEC_NAMES:
+        raise ValueError(f"Unknown compression codec id: {codec_id}")
+    _, _, decompressor = CODECS[CODEC_NAMES[codec_id]]
+    return decompressor(blob[len(MAGIC) + 1:])
@@ -0,0 +1,61 @@
+"""
+Compares compression codecs on stored books: ratio, save and load time.
+
+    python -m src.utils.compression_benchmark [BOOK_FILE ...]
+
+Defaults to the address book and the note book in the data folder, so the
+numbers reflect the real contacts and notes. Without any stored book a
+synthetic one is measured instead.
+"""
+import io
+import os
+import sys
+import time
+from src.utils import compression, record_codec
+from src.utils.record_benchmark import make_book
+from src.utils.storage import PickleBackend
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+DEFAULT_BOOKS = ("address_book.pickle", "note_book.pickle")
+REPEATS = 5
+
+def measure(payload, codec):
+    """(compressed size, best compress seconds, best decompress seconds) of payload"""
+    saves, loads = [], []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        blob = compression.compress(payload, codec)
+        saves.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        compression.decompress(blob)
+        loads.append(time.perf_counter() - started)
+    return len(blob), min(saves), min(loads)
+
+def report(label, data):
+    """Print one line per codec for the serialized data"""
+    buffer = io.BytesIO()
+    record_codec.write_book(data, buffer)
+    payload = buffer.getvalue()
+
+    print(f"{label}: {len(data)} records, {len(payload)} bytes uncompressed")
+    print(f"  {'codec':>6} {'size':>10} {'ratio':>7} {'save, ms':>9} {'load, ms':>9}")
+    for codec in compression.CODECS:
+        size, saved, loaded = measure(payload, codec)
+        print(f"  {codec:>6} {size:>10} {len(payload) / size:>7.2f} {saved * 1000:>9.2f} {loaded * 1000:>9.2f}")
+
+def main(paths):
+    measured = False
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        data = PickleBackend(path, journal=True).load()
+        if data:
+            report(os.path.basename(path), data)
+            measured = True
+
+    if not measured:
+        report("synthetic book (no stored books found)", make_book(10_000))
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(DATA_FOLDER, name) for name in DEFAULT_BOOKS])
@@ -0,0 +1,33 @@
+import os
+import pickle
+from src.utils.normalization import KEY_MODE
+
+# Bumped whenever the layout of a saved index changes; older files are rebuilt,
+# as are files written while search keys were built another way
+INDEX_VERSION = 3
+
+def save_indexes(path, indexes):
+    """Atomically write a dict of named indexes to path, returns whether it worked"""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            pickle.dump((INDEX_VERSION, KEY_MODE, indexes), file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Error saving indexes: {e}")
+        return False
+
+def load_indexes(path):
+    """Dict of named indexes saved at path, empty if there is none or it cannot be used"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as file:
+            saved = pickle.load(file)
+    except Exception as e:
+        print(f"Error loading indexes: {e}")
+        return {}
+    return saved[2] if saved[:2] == (INDEX_VERSION, KEY_MODE) else {}
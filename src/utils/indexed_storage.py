@@ -0,0 +1,187 @@
+import mmap
+import os
+import pickle
+import struct
+from collections.abc import MutableMapping
+from src.utils import record_codec
+from src.utils.storage import PickleBackend, COMPACT_THRESHOLD
+
+# File layout: MAGIC | record blobs | index | index offset (8 bytes, big-endian).
+# The index is a pickled (schema version, list of (key, offset, length) covering
+# every blob); files written before the version was stamped hold just the list.
+MAGIC = b"PAIDX1\n"
+TRAILER = struct.Struct(">Q")
+
+class LazyRecords(MutableMapping):
+    """
+    Dictionary-like view of an indexed file.
+    Only the index is read at startup; a record is decoded from the memory
+    map the first time it is accessed and kept in memory from then on.
+    """
+    def __init__(self, mm, slots, lock):
+        self.mm = mm
+        self.lock = lock
+        # key -> record, or (offset, length) while it has not been read yet
+        self.entries = dict(slots)
+
+    def __getitem__(self, key):
+        value = self.entries[key]
+        if isinstance(value, tuple):
+            with self.lock:
+                value = self.entries[key]
+                if isinstance(value, tuple):
+                    value = record_codec.loads(self.raw(value))
+                    self.entries[key] = value
+        return value
+
+    def __setitem__(self, key, record):
+        self.entries[key] = record
+
+    def __delitem__(self, key):
+        del self.entries[key]
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def raw(self, slot):
+        """Stored bytes of a record that has not been read yet"""
+        offset, length = slot
+        return self.mm[offset:offset + length]
+
+    def loaded_count(self):
+        """Number of records read into memory so far"""
+        return sum(1 for value in self.entries.values() if not isinstance(value, tuple))
+
+    def rebase(self, mm, slots):
+        """Point unread records at a freshly written file"""
+        old_mm, self.mm = self.mm, mm
+        for key, value in self.entries.items():
+            if isinstance(value, tuple):
+                self.entries[key] = slots[key]
+        if old_mm is not None:
+            old_mm.close()
+
+class IndexedBackend(PickleBackend):
+    """Stores one serialized record per blob behind an index, so startup reads only the index"""
+
+    def __init__(self, filepath, journal=False, compact_threshold=COMPACT_THRESHOLD, record_format="pickle",
+                 schema=None):
+        super().__init__(filepath, journal, compact_threshold, record_format, schema=schema)
+        self.records = LazyRecords(None, {}, self.lock)
+
+    def load(self):
+        """Read the index and return a lazy mapping over the records"""
+        try:
+            self.records = LazyRecords(*self._open(), self.lock)
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            self.records = LazyRecords(None, {}, self.lock)
+
+        if self.journal and self.journal.size():
+            try:
+                self.journal.replay(self.records)
+            except Exception as e:
+                print(f"Error loading data: {e}")
+
+        return self.records
+
+    def save(self, data):
+        """Save data to disk"""
+        self.wait()
+        try:
+            with self.lock:
+                self._install(*self._write_tmp(self._snapshot(data)), data)
+                if self.journal:
+                    self.journal.clear()
+            return True
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+
+    def detach(self, data, changes=None):
+        """
+        Snapshots and compactions are written where the records are edited:
+        a copy would load every record, and its unread slots could be moved by
+        a write queued before it
+        """
+        return None
+
+    def _snapshot(self, data):
+        """
+        Entries of data with every record in memory already serialized, so a
+        background compaction never reads records that keep changing. Records
+        still on disk stay (offset, length) slots and are copied over unread.
+        """
+        entries = data.entries if isinstance(data, LazyRecords) else data
+        return {key: value if isinstance(value, (tuple, bytes)) else record_codec.dumps(value, self.record_format)
+                for key, value in entries.items()}
+
+    def _compact(self, snapshot, offset):
+        """Write snapshot and drop the journal entries it already contains"""
+        try:
+            tmp_path, slots = self._write_tmp(snapshot)
+            with self.lock:
+                self._install(tmp_path, slots, self.records)
+                if self.journal:
+                    self.journal.discard(offset)
+        except Exception as e:
+            print(f"Error compacting data: {e}")
+
+    def _write_tmp(self, entries):
+        """Write snapshot entries next to the data file, returns the temporary path and the new slots"""
+        tmp_path = f"{self.filepath}.{os.getpid()}.tmp"
+        slots = {}
+        with open(tmp_path, "wb") as file:
+            file.write(MAGIC)
+            for key, value in entries.items():
+                # Records nobody has touched are copied over without decoding them
+                if isinstance(value, tuple):
+                    with self.lock:
+                        blob = self.records.raw(value)
+                else:
+                    blob = value
+                slots[key] = (file.tell(), len(blob))
+                file.write(blob)
+
+            index_offset = file.tell()
+            pickle.dump((self.schema, [(key, offset, length) for key, (offset, length) in slots.items()]), file)
+            file.write(TRAILER.pack(index_offset))
+            file.flush()
+            os.fsync(file.fileno())
+        return tmp_path, slots
+
+    def _install(self, tmp_path, slots, data):
+        """Replace the data file and remap the records that are still unread"""
+        # The old map must be released first on platforms that lock mapped files
+        if self.records.mm is not None:
+            self.records.mm.close()
+            self.records.mm = None
+        os.replace(tmp_path, self.filepath)
+        mm, _ = self._open()
+        if data is self.records:
+            self.records.rebase(mm, slots)
+        else:
+            self.records = LazyRecords(mm, slots, self.lock)
+
+    def _open(self):
+        """Map the data file and read its index and schema version, returns (mmap, slots)"""
+        if not os.path.exists(self.filepath):
+            return None, {}
+
+        with open(self.filepath, "rb") as file:
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            mm.close()
+            raise ValueError(f"{self.filepath} is not an indexed data file")
+
+        (index_offset,) = TRAILER.unpack(mm[-TRAILER.size:])
+        index = pickle.loads(mm[index_offset:-TRAILER.size])
+        # Unstamped files predate versioning, so every migration applies to them
+        self.loaded_schema, index = index if isinstance(index, tuple) else (0, index)
+        return mm, {key: (offset, length) for key, offset, length in index}
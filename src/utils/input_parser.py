@@ -1,53 +1,90 @@
 import difflib
+import heapq
 from src.utils.localization import Localization
+from src.utils.ngram_index import NGramIndex
+
+# Letter the Ukrainian keyboard layout types on each key of the Latin one
+LAYOUT = dict(zip("`qwertyuiop[]asdfghjkl;'zxcvbnm,.", "ґйцукенгшщзхїфівапролджєячсмитьбю"))
+TO_UKRAINIAN = str.maketrans(LAYOUT)
+# The Russian layout differs from it in a few keys
+TO_LATIN = str.maketrans({**{letter: key for key, letter in LAYOUT.items()}, "ё": "`", "ъ": "]", "ы": "s", "э": "'"})
+
+# Command forms sharing the most bigrams with the input that are compared with it closely
+SUGGESTION_CANDIDATES = 10
+SUGGESTION_CUTOFF = 0.6
+SUGGESTION_LIMIT = 3
+
+class CommandTrie:
+    """
+    Character trie over command forms. The longest form that the input starts
+    with, as a whole word, is found in one pass over the input, however many
+    commands there are.
+    """
+    def __init__(self):
+        # Nested dicts keyed by character; None maps to the command a form stands for
+        self.root = {}
+    
+    def add(self, form, command):
+        """Make form (lowercase) stand for command"""
+        node = self.root
+        for char in form:
+            node = node.setdefault(char, {})
+        node[None] = command
+    
+    def longest_match(self, text):
+        """(command, length of the form) of the longest form text starts with, (None, 0) if there is none"""
+        node = self.root
+        match = (None, 0)
+        for position, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                break
+            # A form only counts if the input does not continue the word ("q" is not "quarter")
+            if None in node and (position + 1 == len(text) or text[position + 1].isspace()):
+                match = (node[None], position + 1)
+        return match
 
 class InputParser:
     """Class for parsing user input and guessing commands with multilingual support"""
     def __init__(self, commands):
         self.commands = commands
-        self.localization = Localization()
-        # Create a mapping of translated commands to original commands
+        self.localization = Localization.shared()
+        self.build()
+    
+    def build(self):
+        """Map every form of every command, English and translated, to the English command"""
+        # Translated form -> original command
         self.command_mapping = {}
-        for cmd in commands:
-            # Check if this command has translations in the localization data
-            for lang_code in self.localization.languages.keys():
-                if lang_code != "en" and cmd in self.localization.translations["en"]:
-                    # Get the translated version of this command
-                    if cmd in self.localization.translations[lang_code]:
-                        translated_cmd = self.localization.translations[lang_code][cmd]
-                        if translated_cmd and translated_cmd != cmd:
-                            self.command_mapping[translated_cmd] = cmd
+        # Every lowercase form, English included -> original command
+        self.forms = {}
+        self.trie = CommandTrie()
+        for cmd in self.commands:
+            self.forms[cmd] = cmd
+            # The command tables of every language are small; their full language packs stay unloaded
+            for forms in self.localization.catalog.command_forms().values():
+                translated_cmd = forms.get(cmd)
+                if translated_cmd and translated_cmd != cmd:
+                    self.command_mapping[translated_cmd] = cmd
+                    self.forms.setdefault(translated_cmd.lower(), cmd)
+        # Bigrams of the padded forms, so that even one-letter commands have some
+        self.similarity = NGramIndex(n=2)
+        for form, cmd in self.forms.items():
+            self.trie.add(form, cmd)
+            self.similarity.add(form, [f" {form} "])
     
     def parse_input(self, user_input):
         """
         Parse user input and return command and arguments.
         Translates commands from non-English languages to English.
-        Now properly handles longer commands before shorter ones.
+        The longest command the input starts with wins, so "show all notes"
+        is not taken for "show all".
         """
-        # Sort commands by length (longer first) to ensure
-        # "show all notes" is checked before "show all"
-        sorted_commands = sorted(self.commands, key=len, reverse=True)
-        
         command = user_input.lower()
-        args = ""
-        
-        # First check if the input starts with any of the sorted commands
-        for cmd in sorted_commands:
-            # Check original language
-            if command.startswith(cmd):
-                command = cmd
-                args = user_input[len(cmd):].strip()
-                return command, args
-            
-            # Check translated version if it exists in the mapping
-            translated_cmd = self.localization.get_text(cmd)
-            if command.startswith(translated_cmd):
-                command = cmd  # Return English command
-                args = user_input[len(translated_cmd):].strip()
-                return command, args
-        
-        # If no command found, return the input as is
-        return command, args
+        matched, length = self.trie.longest_match(command)
+        if matched is None:
+            # If no command found, return the input as is
+            return command, ""
+        return matched, user_input[length:].strip()
     
     def guess_commands(self, user_input):
         """
@@ -56,22 +93,21 @@ class InputParser:
         """
         user_cmd = user_input.lower()
         
-        # Create a list of commands in the current language
-        current_lang_cmds = [self.localization.get_text(cmd) for cmd in self.commands]
-        
-        # Find similar commands using difflib
-        matches = difflib.get_close_matches(user_cmd, current_lang_cmds, n=3, cutoff=0.6)
+        # The input as it was meant if it was typed in the other keyboard layout
+        switched = user_cmd.translate(TO_UKRAINIAN)
+        if switched == user_cmd:
+            switched = user_cmd.translate(TO_LATIN)
+        matched, _ = self.trie.longest_match(switched)
+        if matched is not None:
+            return [matched]
         
-        # Map back to original commands
-        result = []
-        for match in matches:
-            # If it's a translated command, map back to English
-            for cmd in self.commands:
-                if self.localization.get_text(cmd) == match:
-                    result.append(cmd)
-                    break
-            else:
-                # Direct match in English
-                result.append(match)
+        # Only forms sharing bigrams with the input are compared with it, in every language
+        scores = {}
+        for text in {user_cmd, switched}:
+            for form, _ in self.similarity.similar(f" {text} ", SUGGESTION_CANDIDATES):
+                score = difflib.SequenceMatcher(None, text, form).ratio()
+                cmd = self.forms[form]
+                if score >= SUGGESTION_CUTOFF and score > scores.get(cmd, 0):
+                    scores[cmd] = score
         
-        return result
\ No newline at end of file
+        return heapq.nlargest(SUGGESTION_LIMIT, scores, key=scores.get)
@@ -0,0 +1,89 @@
+import os
+import pickle
+import threading
+from src.utils import record_codec
+
+class Journal:
+    """Append-only log of record changes kept next to a snapshot file"""
+    def __init__(self, filepath, lock=None, record_format="pickle"):
+        self.filepath = filepath
+        self.record_format = record_format
+        self.lock = lock or threading.RLock()
+
+    def append(self, changes):
+        """Append a change set ({key: record or None for deletion}) to the log"""
+        with self.lock:
+            with open(self.filepath, "ab") as file:
+                for key, record in changes.items():
+                    if record is not None:
+                        record = record_codec.dumps(record, self.record_format)
+                    pickle.dump((key, record), file)
+                file.flush()
+                os.fsync(file.fileno())
+
+    def replay(self, data):
+        """Apply logged changes on top of data, returns the number of entries applied"""
+        if not os.path.exists(self.filepath):
+            return 0
+
+        applied = 0
+        with self.lock:
+            with open(self.filepath, "rb") as file:
+                good_offset = 0
+                while True:
+                    try:
+                        key, record = pickle.load(file)
+                    except EOFError:
+                        break
+                    except Exception:
+                        # A torn write at the tail (e.g. crash mid-append): drop it
+                        # so that later appends are not hidden behind garbage
+                        file.close()
+                        self._truncate_to(good_offset)
+                        break
+
+                    if record is None:
+                        data.pop(key, None)
+                    else:
+                        # Entries written before the record codec hold the record itself
+                        data[key] = record_codec.loads(record) if isinstance(record, bytes) else record
+                    applied += 1
+                    good_offset = file.tell()
+
+        return applied
+
+    def size(self):
+        """Size of the log in bytes"""
+        try:
+            return os.path.getsize(self.filepath)
+        except OSError:
+            return 0
+
+    def clear(self):
+        """Remove all logged changes"""
+        with self.lock:
+            if os.path.exists(self.filepath):
+                os.remove(self.filepath)
+
+    def discard(self, offset):
+        """Drop the first offset bytes of the log, keeping entries written after them"""
+        with self.lock:
+            if offset >= self.size():
+                self.clear()
+                return
+
+            with open(self.filepath, "rb") as file:
+                file.seek(offset)
+                tail = file.read()
+
+            tmp_path = self.filepath + ".tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(tail)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.filepath)
+
+    def _truncate_to(self, offset):
+        """Cut the log at offset"""
+        with open(self.filepath, "r+b") as file:
+            file.truncate(offset)
@@ -0,0 +1,120 @@
+import heapq
+import itertools
+
+class NGramIndex:
+    """
+    Inverted index from character n-grams to the items whose texts contain them.
+    A query of at least n characters can only be a substring of an item's text
+    if all of its n-grams occur in that text, so intersecting the posting sets
+    narrows a search to a few candidates, which the caller still has to check.
+    Items are hashed by identity, so records can be indexed directly.
+    """
+    def __init__(self, n=3):
+        self.n = n
+        # n-gram -> items containing it
+        self.postings = {}
+        # item -> (insertion number, its n-grams); the number keeps results in insertion order
+        self.items = {}
+        self.counter = itertools.count()
+
+    def grams(self, texts):
+        """n-grams of texts (not spanning two texts)"""
+        n = self.n
+        return {text[i:i + n] for text in texts for i in range(len(text) - n + 1)}
+
+    def add(self, item, texts):
+        """Index item under the n-grams of texts, replacing what it was indexed under before"""
+        number = self.remove(item)
+        if number is None:
+            number = next(self.counter)
+
+        grams = self.grams(texts)
+        postings = self.postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {item}
+            else:
+                posting.add(item)
+        self.items[item] = (number, grams)
+
+    def remove(self, item):
+        """Drop item from the index, returns its insertion number (None if it was not indexed)"""
+        entry = self.items.pop(item, None)
+        if entry is None:
+            return None
+
+        number, grams = entry
+        for gram in grams:
+            posting = self.postings[gram]
+            posting.discard(item)
+            if not posting:
+                del self.postings[gram]
+        return number
+
+    def candidates(self, query, *alternatives):
+        """
+        Items that may contain query (or one of the alternatives), in insertion
+        order; None if a query is too short or too common to narrow the search.
+        """
+        result = set()
+        for text in (query,) + alternatives:
+            found = self._matching(text)
+            if found is None:
+                return None
+            result |= found
+        return sorted(result, key=lambda item: self.items[item][0])
+
+    def similar(self, query, limit, threshold=0.0):
+        """
+        (item, score) of the limit items sharing the most n-grams with query, best
+        first. The score is the share of the query's n-grams found in the item;
+        items below threshold are left out. Among equal scores, items with fewer
+        n-grams of their own (a closer fit) come first.
+        """
+        grams = self.grams([query])
+        if not grams:
+            return []
+
+        # Only the postings of the query's n-grams are visited
+        shared = {}
+        for gram in grams:
+            for item in self.postings.get(gram, ()):
+                shared[item] = shared.get(item, 0) + 1
+
+        minimum = threshold * len(grams)
+        items = self.items
+        ranked = ((count, count / len(items[item][1]), -items[item][0], item)
+                  for item, count in shared.items() if count >= minimum)
+        best = heapq.nlargest(limit, ranked, key=lambda entry: entry[:3])
+        return [(item, count / len(grams)) for count, _, _, item in best]
+
+    def _matching(self, query):
+        """Set of items holding every n-gram of query, None if that does not narrow the search"""
+        if len(query) < self.n:
+            return None
+
+        postings = []
+        for gram in self.grams([query]):
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            postings.append(posting)
+
+        # Intersect starting from the rarest n-gram
+        postings.sort(key=len)
+        # Narrowing to most of the items is slower than scanning them
+        if len(postings[0]) > len(self.items) // 2:
+            return None
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,50 @@
+"""
+Normalized search keys.
+
+Searches compare keys instead of raw text. A key is the text in NFKC form,
+casefolded and, unless ASSISTANT_TRANSLITERATE=0, with Cyrillic letters
+transliterated to Latin by the Ukrainian national system, so that
+"Олександр" and "Oleksandr" have the same key.
+"""
+import os
+import re
+import unicodedata
+
+TRANSLITERATE = os.environ.get("ASSISTANT_TRANSLITERATE", "1") == "1"
+
+# Names how keys are built; keys stored under another setting are computed again
+KEY_MODE = "nfkc-casefold-latin" if TRANSLITERATE else "nfkc-casefold"
+
+# Ukrainian letters (2010 national standard) and the few Russian ones that differ
+LETTERS = {
+    "а": "a", "б": "b", "в": "v", "г": "h", "ґ": "g", "д": "d", "е": "e", "є": "ie", "ж": "zh", "з": "z",
+    "и": "y", "і": "i", "ї": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+    "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch", "ш": "sh",
+    "щ": "shch", "ь": "", "ю": "iu", "я": "ia", "ё": "io", "ы": "y", "э": "e", "ъ": "",
+}
+TABLE = str.maketrans(LETTERS)
+
+# Letters written differently at the start of a word
+WORD_START = {"є": "ye", "ї": "yi", "й": "y", "ю": "yu", "я": "ya"}
+WORD_START_LETTER = re.compile(r"(?<![\w'’ʼ])[єїйюя]")
+
+# Apostrophes inside a Cyrillic word are not transliterated
+APOSTROPHE = re.compile(r"(?<=[а-яіїєґ])['’ʼ](?=[а-яіїєґ])")
+CYRILLIC = re.compile(r"[а-яёіїєґ]")
+
+def transliterate(text):
+    """Latin transliteration of the Cyrillic letters of a lowercase text; other characters are kept"""
+    if not CYRILLIC.search(text):
+        return text
+    text = APOSTROPHE.sub("", text)
+    text = WORD_START_LETTER.sub(lambda found: WORD_START[found.group(0)], text)
+    # Keeps зг apart from ж
+    text = text.replace("зг", "zgh")
+    return text.translate(TABLE)
+
+def search_key(text):
+    """Normalized form of text that searches compare (None stays None)"""
+    if text is None:
+        return None
+    key = unicodedata.normalize("NFKC", text).casefold()
+    return transliterate(key) if TRANSLITERATE else key
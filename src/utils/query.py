@@ -0,0 +1,171 @@
+"""
+Structured queries over the address book and the note book.
+
+A query is a list of conditions that all have to hold (AND may be written
+between them): field:value, field:"quoted value", field:>value (also <, >=
+and <= for dates), or a bare word or "phrase" looked for in every field.
+A * in a value matches any text.
+
+The planner asks every condition that an index can answer for its posting
+list, intersects the lists from the smallest one up, and only then loads
+the remaining records to check every condition on them.
+"""
+import fnmatch
+import re
+from datetime import datetime
+from src.utils.normalization import search_key
+
+TERM = re.compile(r'(?:(\w+):(>=|<=|>|<)?)?(?:"([^"]*)"|(\S+))')
+
+class QueryError(ValueError):
+    """A query that cannot be parsed or refers to an unknown field"""
+
+class Term:
+    """One field:value part of a query as written"""
+    def __init__(self, field, op, value, quoted):
+        self.field = field
+        self.op = op
+        self.value = value
+        self.quoted = quoted
+
+    def __str__(self):
+        value = f'"{self.value}"' if self.quoted else self.value
+        return f"{self.field}:{self.op}{value}" if self.field else value
+
+class Condition:
+    """
+    A condition on records: match checks one record, lookup (if an index can
+    narrow the condition) returns the keys of the records that may match, or
+    None when the index does not help for this value.
+    """
+    def __init__(self, term, match, lookup=None, index=None):
+        self.term = term
+        self.match = match
+        self.lookup = lookup
+        self.index = index
+
+def parse(text):
+    """Terms of a query"""
+    terms = []
+    for found in TERM.finditer(text):
+        field, op, quoted, word = found.groups()
+        if field is None and quoted is None:
+            if word == "AND":
+                continue
+            if word in ("OR", "NOT"):
+                raise QueryError(f"{word} is not supported, conditions are always combined with AND")
+        if op and not field:
+            raise QueryError(f"Comparison without a field in '{found.group(0)}'")
+        terms.append(Term(field.lower() if field else None, op or "", quoted if quoted is not None else word,
+                          quoted is not None))
+    if not terms:
+        raise QueryError("Query is empty")
+    return terms
+
+class Plan:
+    """Conditions of a query in the order the planner applies their indexes"""
+    def __init__(self, book, text):
+        self.book = book
+        self.conditions = [book.condition(term) for term in parse(text)]
+        # (condition, posting list size) of every condition answered by an index, smallest first
+        self.steps = []
+        self.examined = 0
+
+    def execute(self):
+        """Records matching every condition"""
+        postings = []
+        for condition in self.conditions:
+            keys = condition.lookup() if condition.lookup else None
+            if keys is not None:
+                postings.append((condition, keys))
+        postings.sort(key=lambda entry: len(entry[1]))
+        self.steps = [(condition, len(keys)) for condition, keys in postings]
+
+        candidates = None
+        for _, keys in postings:
+            candidates = set(keys) if candidates is None else candidates & set(keys)
+            if not candidates:
+                break
+
+        data = self.book.data
+        if candidates is None:
+            records = data.values()
+        else:
+            records = (data[key] for key in sorted(candidates) if key in data)
+
+        results = []
+        self.examined = 0
+        for record in records:
+            self.examined += 1
+            if all(condition.match(record) for condition in self.conditions):
+                results.append(record)
+        return results
+
+    def explain(self):
+        """Lines describing how the query was answered (call after execute)"""
+        lines = []
+        for number, (condition, size) in enumerate(self.steps, 1):
+            lines.append(f"{number}. {condition.term}: {condition.index}, {size} keys")
+        indexed = {id(condition) for condition, _ in self.steps}
+        for condition in self.conditions:
+            if id(condition) not in indexed:
+                lines.append(f"   {condition.term}: checked on each record")
+        if not self.steps:
+            lines.append(f"No index applies: scanned all {len(self.book.data)} records")
+        lines.append(f"Examined {self.examined} records")
+        return lines
+
+def text_match(value):
+    """Test of a field's search key: a glob if value holds *, otherwise a substring"""
+    value = search_key(value)
+    if "*" in value:
+        return lambda key: fnmatch.fnmatchcase(key, value)
+    return lambda key: value in key
+
+def prefix_of(value):
+    """Text before a single trailing *, None if value is not such a prefix pattern"""
+    if value.endswith("*") and "*" not in value[:-1] and len(value) > 1:
+        return value[:-1]
+    return None
+
+def date_match(term):
+    """Test of a datetime against a YYYY-MM-DD date and the term's comparison"""
+    try:
+        day = datetime.strptime(term.value, "%Y-%m-%d").date()
+    except ValueError:
+        raise QueryError(f"Invalid date in '{term}', use YYYY-MM-DD")
+    return {
+        "": lambda value: value.date() == day,
+        ">": lambda value: value.date() > day,
+        "<": lambda value: value.date() < day,
+        ">=": lambda value: value.date() >= day,
+        "<=": lambda value: value.date() <= day,
+    }[term.op]
+
+def name_condition(book, term):
+    """Condition on the search keys of whole record names; name* and exact names are answered by the name index"""
+    prefix = prefix_of(term.value)
+    if prefix is not None:
+        key = search_key(prefix)
+        return Condition(term, lambda record: record.name.key.startswith(key),
+                         lambda: book._names().prefix(key), "name index (prefix)")
+    if "*" not in term.value:
+        key = search_key(term.value)
+        return Condition(term, lambda record: record.name.key == key,
+                         lambda: book._names().find(key), "name index (exact)")
+    match = text_match(term.value)
+    return Condition(term, lambda record: match(record.name.key))
+
+def dated_condition(term, attribute):
+    """Condition on created_at or updated_at"""
+    compare = date_match(term)
+    return Condition(term, lambda record: compare(getattr(record, attribute)))
+
+def check_field(term, fields):
+    """Field of a term (text for bare words); QueryError if the book does not know it or it cannot be compared"""
+    field = term.field or "text"
+    if field not in fields:
+        raise QueryError(f"Unknown field '{field}', use one of: {', '.join(sorted(fields))}")
+    if term.op and field not in ("created", "updated"):
+        raise QueryError(f"Field '{field}' cannot be compared with {term.op}")
+    return field
@@ -0,0 +1,61 @@
+"""
+Compares the binary record format with pickle: file size, save and load time.
+
+    python -m src.utils.record_benchmark [COUNT ...]
+
+Defaults to 10k, 100k and 1M contacts plus as many notes.
+"""
+import io
+import sys
+import time
+from datetime import datetime, timedelta
+from src.record import ContactRecord, NoteRecord
+from src.utils import record_codec
+
+DEFAULT_COUNTS = (10_000, 100_000, 1_000_000)
+
+def make_book(count):
+    """Synthetic {name: record} mapping with count contacts and count notes"""
+    start = datetime(2024, 1, 1, 9, 30)
+    data = {}
+    for i in range(count):
+        contact = ContactRecord(f"Contact {i}")
+        contact.add_phone(f"{380000000000 + i}")
+        if i % 2:
+            contact.add_email(f"user{i}@example.com")
+        if i % 3:
+            contact.set_address(f"{i} Khreshchatyk St, Kyiv")
+        if i % 4:
+            contact.set_birthday(f"{1950 + i % 60}-{1 + i % 12:02d}-{1 + i % 28:02d}")
+        contact.created_at = start + timedelta(seconds=i)
+        contact.updated_at = contact.created_at
+        data[contact.name.value] = contact
+
+        note = NoteRecord(f"Note {i}", f"Reminder number {i}: call back about the order")
+        note.add_tag("work" if i % 2 else "home")
+        data[note.name.value] = note
+    return data
+
+def measure(data, record_format):
+    """(size in bytes, save seconds, load seconds) of data in record_format"""
+    buffer = io.BytesIO()
+    started = time.perf_counter()
+    record_codec.write_book(data, buffer, record_format)
+    saved = time.perf_counter() - started
+
+    buffer.seek(0)
+    started = time.perf_counter()
+    record_codec.read_book(buffer)
+    loaded = time.perf_counter() - started
+    return len(buffer.getvalue()), saved, loaded
+
+def main(counts):
+    print(f"{'records':>10} {'format':>7} {'size, MB':>10} {'save, s':>9} {'load, s':>9}")
+    for count in counts:
+        data = make_book(count)
+        for record_format in ("pickle", "binary"):
+            size, saved, loaded = measure(data, record_format)
+            print(f"{len(data):>10} {record_format:>7} {size / 2 ** 20:>10.2f} {saved:>9.3f} {loaded:>9.3f}")
+
+if __name__ == "__main__":
+    main([int(count) for count in sys.argv[1:]] or DEFAULT_COUNTS)
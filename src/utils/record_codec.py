@@ -0,0 +1,245 @@
+"""
+Compact binary serialization for contact and note records.
+
+A record is a fixed header followed by the lengths of its strings and then
+the strings themselves as one UTF-8 payload:
+
+    header   >BBBqqIHH  kind, flags, length width, created_at and updated_at
+                        (microseconds since 1970-01-01), birthday (date
+                        ordinal, 0 if none), two list sizes
+    lengths  one B/H/I per string, in characters
+    payload  UTF-8 of all strings joined together
+
+The strings are the field values, then (flag HAS_KEYS) the key mode and the
+search key of every field (see Field.key), so loading does not build them
+again.
+
+A book file is BOOK_MAGIC, a format version byte, the schema version of its
+records (see src.migrations) and a body byte, followed either by a sequence
+of records, each prefixed with its size as >I, or by one pickle of the whole
+mapping. Version 1 files have no schema or body byte and always hold binary
+records; records in version 3 files carry their search keys. Readers still accept plain pickles, so files written before this
+format load unchanged.
+"""
+import os
+import pickle
+import struct
+import sys
+from datetime import date, datetime, timedelta
+from src.field import Name, Phone, Email, Address, Birthday, Tag
+from src.migrations import SCHEMA_VERSION
+from src.record import ContactRecord, NoteRecord
+from src.utils.normalization import KEY_MODE
+
+FORMAT_VERSION = 3
+BOOK_MAGIC = b"PAREC"
+
+CONTACT = ord("C")
+NOTE = ord("N")
+
+HAS_ADDRESS = 1
+HAS_KEYS = 2
+
+# Body of a book file: binary records or a pickled mapping
+BINARY_BODY = ord("B")
+PICKLE_BODY = ord("P")
+
+# Schema of version 1 files, which could only hold current records; plain pickles count as 0
+V1_SCHEMA = 1
+
+HEADER = struct.Struct(">BBBqqIHH")
+SIZE = struct.Struct(">I")
+LENGTH_CODES = "BHI"
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+def _field(cls, value):
+    """Rebuild a stored field without validating it again"""
+    field = cls.__new__(cls)
+    field.value = value
+    return field
+
+def _timestamp(moment):
+    """Microseconds since EPOCH"""
+    return (moment - EPOCH) // MICROSECOND
+
+def encode_record(record):
+    """Serialize a ContactRecord or NoteRecord"""
+    flags = HAS_KEYS
+    ordinal = 0
+    if isinstance(record, ContactRecord):
+        kind = CONTACT
+        if record.address is not None:
+            flags |= HAS_ADDRESS
+        fields = _keyed_fields(record)
+        strings = [field.value for field in fields]
+        counts = (len(record.phones), len(record.emails))
+        if record.birthday:
+            ordinal = record.birthday.date.toordinal()
+    elif isinstance(record, NoteRecord):
+        kind = NOTE
+        fields = _keyed_fields(record)
+        strings = [record.name.value, record.content]
+        strings.extend(tag.value for tag in record.tags)
+        counts = (len(record.tags), 0)
+    else:
+        raise TypeError(f"Cannot encode {type(record).__name__}")
+    strings.append(KEY_MODE)
+    strings.extend(field.key for field in fields)
+
+    lengths = [len(string) for string in strings]
+    longest = max(lengths)
+    code = 0 if longest < 0x100 else 1 if longest < 0x10000 else 2
+
+    return b"".join((
+        HEADER.pack(kind, flags, code, _timestamp(record.created_at), _timestamp(record.updated_at),
+                    ordinal, *counts),
+        struct.pack(f">{len(lengths)}{LENGTH_CODES[code]}", *lengths),
+        "".join(strings).encode("utf-8"),
+    ))
+
+def decode_record(blob):
+    """Rebuild a record serialized by encode_record"""
+    kind, flags, code, created, updated, ordinal, first, second = HEADER.unpack_from(blob)
+    if kind == CONTACT:
+        count = keyed = 1 + (flags & HAS_ADDRESS) + first + second
+    elif kind == NOTE:
+        count = 2 + first
+        keyed = 1 + first
+    else:
+        raise ValueError(f"Unknown record kind: {kind}")
+    total = count + 1 + keyed if flags & HAS_KEYS else count
+
+    lengths_format = f">{total}{LENGTH_CODES[code]}"
+    offset = HEADER.size + struct.calcsize(lengths_format)
+    lengths = struct.unpack_from(lengths_format, blob, HEADER.size)
+    payload = blob[offset:].decode("utf-8")
+
+    strings = []
+    position = 0
+    for length in lengths:
+        strings.append(payload[position:position + length])
+        position += length
+
+    if kind == CONTACT:
+        record = ContactRecord.__new__(ContactRecord)
+        record.name = _field(Name, strings[0])
+        index = 1
+        record.address = None
+        if flags & HAS_ADDRESS:
+            record.address = _field(Address, strings[1])
+            index = 2
+        record.phones = [_field(Phone, value) for value in strings[index:index + first]]
+        index += first
+        record.emails = [_field(Email, value) for value in strings[index:index + second]]
+        record.birthday = None
+        if ordinal:
+            birthday = date.fromordinal(ordinal)
+            record.birthday = _field(Birthday, birthday.isoformat())
+            record.birthday.date = birthday
+    else:
+        record = NoteRecord.__new__(NoteRecord)
+        record.name = _field(Name, strings[0])
+        record.content = strings[1]
+        record.tags = [_field(Tag, value) for value in strings[2:count]]
+
+    if flags & HAS_KEYS:
+        mode = strings[count]
+        for field, key in zip(_keyed_fields(record), strings[count + 1:]):
+            field._key = (field.value, mode, key)
+
+    record.created_at = EPOCH + created * MICROSECOND
+    record.updated_at = EPOCH + updated * MICROSECOND
+    return record
+
+def _keyed_fields(record):
+    """Fields of a record whose search keys are stored, in storage order"""
+    if isinstance(record, ContactRecord):
+        address = [record.address] if record.address is not None else []
+        return [record.name, *address, *record.phones, *record.emails]
+    return [record.name, *record.tags]
+
+def dumps(record, record_format="binary"):
+    """Serialize one record in the given format ("binary" or "pickle")"""
+    if record_format == "binary":
+        return encode_record(record)
+    return pickle.dumps(record)
+
+def loads(blob):
+    """Deserialize one record written by dumps in either format"""
+    # Pickles (protocol 2+) start with the PROTO opcode; binary records with their kind
+    if blob[:1] == b"\x80":
+        return pickle.loads(blob)
+    return decode_record(blob)
+
+def write_book(data, file, record_format="binary", schema=SCHEMA_VERSION):
+    """Write a {name: record} mapping to an open binary file, stamped with its schema version"""
+    if record_format != "binary":
+        # Without a schema, pickled as is: storages of other data (e.g. settings) use this too
+        if schema is not None:
+            file.write(BOOK_MAGIC + bytes([FORMAT_VERSION, schema, PICKLE_BODY]))
+        pickle.dump(data, file)
+        return
+
+    # Binary records can only hold the current layout
+    file.write(BOOK_MAGIC + bytes([FORMAT_VERSION, SCHEMA_VERSION, BINARY_BODY]))
+    for record in data.values():
+        blob = encode_record(record)
+        file.write(SIZE.pack(len(blob)))
+        file.write(blob)
+
+def read_book(file):
+    """Read a mapping written by write_book in either format, or any plain pickle"""
+    return read_versioned_book(file)[0]
+
+def read_versioned_book(file):
+    """Read a mapping like read_book, returns (mapping, schema version of its records)"""
+    head = file.read(len(BOOK_MAGIC) + 1)
+    if head[:len(BOOK_MAGIC)] != BOOK_MAGIC:
+        file.seek(0)
+        return pickle.load(file), 0
+    version = head[-1]
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Record format version {version} is newer than this program supports")
+
+    schema, body = V1_SCHEMA, BINARY_BODY
+    if version >= 2:
+        schema, body = file.read(2)
+    if schema > SCHEMA_VERSION:
+        raise ValueError(f"Record schema version {schema} is newer than this program supports")
+    if body == PICKLE_BODY:
+        return pickle.load(file), schema
+
+    data = {}
+    content = file.read()
+    offset = 0
+    while offset < len(content):
+        (size,) = SIZE.unpack_from(content, offset)
+        offset += SIZE.size
+        record = decode_record(content[offset:offset + size])
+        offset += size
+        data[record.name.value] = record
+    return data, schema
+
+def convert_pickle_file(source, target=None):
+    """Rewrite a pickled book in the binary format, in place unless target is given"""
+    with open(source, "rb") as file:
+        data = read_book(file)
+
+    target = target or source
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "wb") as file:
+        write_book(data, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, target)
+    return len(data)
+
+if __name__ == "__main__":
+    # python -m src.utils.record_codec data/address_book.pickle [converted.bin]
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m src.utils.record_codec SOURCE [TARGET]")
+        sys.exit(1)
+    converted = convert_pickle_file(*sys.argv[1:])
+    print(f"Converted {converted} records.")
@@ -0,0 +1,191 @@
+import copy
+import io
+import json
+import os
+import re
+import threading
+import zlib
+from src.utils import compression, record_codec
+from src.utils.storage import StorageBackend
+
+MANIFEST = "manifest.json"
+SHARD_FILE = re.compile(r"^shard-\d+-\d+\.pickle$")
+
+def shard_of(key, count):
+    """Shard number of a record key (stable across processes, unlike hash())"""
+    return zlib.crc32(key.encode("utf-8")) % count
+
+class ShardedBackend(StorageBackend):
+    """
+    Splits a mapping over several book files by a hash of the key.
+    Saving rewrites only the shards a change set touched. New shard files are
+    written under a new generation and the manifest is replaced atomically to
+    commit them, so a crash leaves either the old or the new set of shards.
+    The manifest also numbers the records in the order they were added, which
+    the book is loaded back in.
+    """
+    def __init__(self, folder, shards, record_format="pickle", codec="none"):
+        self.folder = folder
+        self.record_format = record_format
+        compression.check_codec(codec)
+        self.codec = codec
+        self.lock = threading.RLock()
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+        self.manifest = self._read_manifest() or {"generation": 0, "shards": shards, "files": [None] * shards}
+        # Keys held by each shard -> their insertion numbers, so a dirty shard can be rebuilt without scanning the book
+        self.shard_keys = [{} for _ in range(self.manifest["shards"])]
+
+    def load(self):
+        """Load every shard, None if nothing is stored yet"""
+        if not any(self.manifest["files"]):
+            return None
+
+        # (insertion number, key, record) of every record
+        entries = []
+        sequences = self.manifest.get("sequences")
+        try:
+            for number, filename in enumerate(self.manifest["files"]):
+                if filename is None:
+                    continue
+                with open(os.path.join(self.folder, filename), "rb") as file:
+                    shard, schema = record_codec.read_versioned_book(
+                        io.BytesIO(compression.decompress(file.read())))
+                # The book is as old as its oldest shard
+                self.loaded_schema = schema if self.loaded_schema is None else min(self.loaded_schema, schema)
+                # Manifests written before records were numbered keep the shard order
+                numbers = sequences[number] if sequences else range(len(entries), len(entries) + len(shard))
+                self.shard_keys[number] = dict(zip(shard, numbers))
+                entries.extend(zip(numbers, shard, shard.values()))
+        except Exception as e:
+            print(f"Error loading data: {e}")
+            return None
+
+        self._remove_orphans()
+        entries.sort(key=lambda entry: entry[0])
+        return {key: record for _, key, record in entries}
+
+    def save(self, data):
+        """Rewrite every shard"""
+        with self.lock:
+            return self._rewrite(data, self.manifest["shards"])
+
+    def apply(self, changes, data):
+        """Rewrite the shards touched by the change set"""
+        with self.lock:
+            count = self.manifest["shards"]
+            sequence = self._next_sequence()
+            # Changed on copies of the dirty shards, so a failed write leaves the layout as it was
+            shard_keys = list(self.shard_keys)
+            dirty = set()
+            for key, record in changes.items():
+                number = shard_of(key, count)
+                if number not in dirty:
+                    shard_keys[number] = dict(shard_keys[number])
+                    dirty.add(number)
+                if record is None:
+                    shard_keys[number].pop(key, None)
+                elif key not in shard_keys[number]:
+                    shard_keys[number][key] = sequence
+                    sequence += 1
+            return self._commit(sorted(dirty), data, count, shard_keys, sequence)
+
+    def detach(self, data, changes=None):
+        """Copies of the records in the shards the change set touches, which are all a write reads"""
+        if changes is None:
+            return super().detach(data)
+        count = self.manifest["shards"]
+        dirty = {shard_of(key, count) for key in changes}
+        return {key: copy.deepcopy(record) for key, record in data.items() if shard_of(key, count) in dirty}
+
+    def reshard(self, count, data):
+        """Redistribute all records over count shards"""
+        if count < 1:
+            raise ValueError("Number of shards must be positive")
+        with self.lock:
+            return self._rewrite(data, count)
+
+    def _rewrite(self, data, count):
+        """Write all records into count shards; the layout in memory only changes once that is committed"""
+        shard_keys = [{} for _ in range(count)]
+        # Numbered afresh in the order of data
+        for sequence, key in enumerate(data):
+            shard_keys[shard_of(key, count)][key] = sequence
+        return self._commit(range(count), data, count, shard_keys, len(data), [None] * count)
+
+    def _next_sequence(self):
+        """Insertion number of the next new record"""
+        next_sequence = self.manifest.get("next_sequence")
+        if next_sequence is None:
+            next_sequence = sum(len(keys) for keys in self.shard_keys)
+        return next_sequence
+
+    def _commit(self, numbers, data, count, shard_keys, sequence, files=None):
+        """
+        Write the given shards of the shard_keys layout under a new generation and
+        switch the manifest to them, with sequence as the next insertion number.
+        files defaults to the current ones; the layout in memory is only replaced
+        once the new manifest is on disk.
+        """
+        generation = self.manifest["generation"] + 1
+        files = list(self.manifest["files"]) if files is None else files
+        try:
+            for number in numbers:
+                keys = shard_keys[number]
+                if not keys:
+                    files[number] = None
+                    continue
+                filename = f"shard-{number:03d}-{generation}.pickle"
+                self._write(filename, {key: data[key] for key in keys})
+                files[number] = filename
+
+            manifest = {"generation": generation, "shards": count, "files": files,
+                        "sequences": [list(keys.values()) for keys in shard_keys], "next_sequence": sequence}
+            self._write_manifest(manifest)
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+
+        self.manifest = manifest
+        self.shard_keys = shard_keys
+        self._remove_orphans()
+        return True
+
+    def _write(self, filename, shard):
+        """Write one shard file"""
+        path = os.path.join(self.folder, filename)
+        buffer = io.BytesIO()
+        record_codec.write_book(shard, buffer, self.record_format)
+        with open(path, "wb") as file:
+            file.write(compression.compress(buffer.getvalue(), self.codec))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def _read_manifest(self):
+        """Read the manifest, None if there is none"""
+        path = os.path.join(self.folder, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _write_manifest(self, manifest):
+        """Atomically replace the manifest: this is the commit point"""
+        path = os.path.join(self.folder, MANIFEST)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    def _remove_orphans(self):
+        """Delete shard files that the manifest no longer references"""
+        current = set(self.manifest["files"])
+        for filename in os.listdir(self.folder):
+            if SHARD_FILE.match(filename) and filename not in current:
+                try:
+                    os.remove(os.path.join(self.folder, filename))
+                except OSError:
+                    pass
@@ -0,0 +1,77 @@
+from bisect import bisect_left, bisect_right
+
+# Sorts after every character, so [prefix, prefix + END) spans all keys starting with prefix
+END = "\U0010ffff"
+
+class SortedIndex:
+    """
+    Sorted array of string keys and the items indexed under them, such as
+    canonical phone numbers and the records holding them, or casefolded names.
+    Exact and prefix lookups are two binary searches; a change costs one
+    insertion into the array, which is a memory move rather than a rebuild.
+    """
+    def __init__(self, entries=()):
+        # entries: (item, keys) pairs, sorted once instead of inserted one by one
+        self.items = {}
+        pairs = []
+        for item, keys in entries:
+            keys = tuple(keys)
+            self.items[item] = keys
+            pairs.extend((key, item) for key in keys)
+        pairs.sort(key=lambda pair: pair[0])
+        self.keys = [key for key, _ in pairs]
+        self.values = [item for _, item in pairs]
+
+    def add(self, item, keys):
+        """Index item under keys, replacing what it was indexed under before"""
+        self.remove(item)
+        keys = tuple(keys)
+        for key in keys:
+            position = bisect_right(self.keys, key)
+            self.keys.insert(position, key)
+            self.values.insert(position, item)
+        self.items[item] = keys
+
+    def remove(self, item):
+        """Drop item from the index"""
+        for key in self.items.pop(item, ()):
+            for position in range(bisect_left(self.keys, key), bisect_right(self.keys, key)):
+                if self.values[position] == item:
+                    del self.keys[position]
+                    del self.values[position]
+                    break
+
+    def find(self, key):
+        """Items indexed under exactly this key"""
+        return self._unique(bisect_left(self.keys, key), bisect_right(self.keys, key))
+
+    def prefix(self, prefix, limit=None):
+        """Items with a key starting with prefix, in key order"""
+        return self._unique(bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + END), limit)
+
+    def counts(self, prefix=""):
+        """(key, number of items) for every distinct key starting with prefix, in key order"""
+        result = []
+        start, stop = bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + END)
+        while start < stop:
+            # All positions holding this key
+            end = bisect_right(self.keys, self.keys[start], start, stop)
+            result.append((self.keys[start], len(set(self.values[start:end]))))
+            start = end
+        return result
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def _unique(self, start, stop, limit=None):
+        """Items in positions start..stop, each once"""
+        seen = set()
+        result = []
+        for position in range(start, stop):
+            item = self.values[position]
+            if item not in seen:
+                seen.add(item)
+                result.append(item)
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
@@ -0,0 +1,327 @@
+import calendar
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from src.field import Phone, Email, Address, Birthday, Tag
+from src.record import ContactRecord, NoteRecord
+from src.utils.normalization import KEY_MODE, search_key
+from src.utils.storage import StorageBackend
+
+# The *_lower columns hold search keys (see src.utils.normalization)
+CONTACTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    name TEXT PRIMARY KEY,
+    name_lower TEXT NOT NULL,
+    address TEXT,
+    address_lower TEXT,
+    birthday TEXT,
+    birthday_md TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contacts_name_lower ON contacts (name_lower);
+CREATE INDEX IF NOT EXISTS contacts_birthday_md ON contacts (birthday_md);
+CREATE TABLE IF NOT EXISTS phones (
+    contact TEXT NOT NULL REFERENCES contacts (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phones_contact ON phones (contact);
+CREATE INDEX IF NOT EXISTS phones_value ON phones (value);
+CREATE TABLE IF NOT EXISTS emails (
+    contact TEXT NOT NULL REFERENCES contacts (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    value_lower TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS emails_contact ON emails (contact);
+CREATE INDEX IF NOT EXISTS emails_value_lower ON emails (value_lower);
+"""
+
+NOTES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    name TEXT PRIMARY KEY,
+    name_lower TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_name_lower ON notes (name_lower);
+CREATE TABLE IF NOT EXISTS note_tags (
+    note TEXT NOT NULL REFERENCES notes (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    tag_lower TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS note_tags_note ON note_tags (note);
+CREATE INDEX IF NOT EXISTS note_tags_tag_lower ON note_tags (tag_lower);
+"""
+
+class ContactTable:
+    """Maps ContactRecord objects to the contacts, phones and emails tables"""
+    table = "contacts"
+    schema = CONTACTS_SCHEMA
+    # Columns of search keys, refreshed when keys are built another way
+    key_columns = [("contacts", "name_lower", "name"), ("contacts", "address_lower", "address"),
+                   ("emails", "value_lower", "value")]
+
+    @staticmethod
+    def write(conn, record):
+        """Insert or update a contact with its phones and emails"""
+        name = record.name.value
+        address = record.address.value if record.address else None
+        birthday = record.birthday.value if record.birthday else None
+        conn.execute(
+            """INSERT INTO contacts (name, name_lower, address, address_lower, birthday, birthday_md,
+                                     created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (name) DO UPDATE SET
+                   name_lower = excluded.name_lower, address = excluded.address,
+                   address_lower = excluded.address_lower, birthday = excluded.birthday,
+                   birthday_md = excluded.birthday_md, created_at = excluded.created_at,
+                   updated_at = excluded.updated_at""",
+            (name, record.name.key, address, record.address.key if address else None,
+             birthday, record.birthday.date.strftime("%m-%d") if record.birthday else None,
+             record.created_at.isoformat(), record.updated_at.isoformat()))
+
+        conn.execute("DELETE FROM phones WHERE contact = ?", (name,))
+        conn.executemany("INSERT INTO phones (contact, position, value) VALUES (?, ?, ?)",
+                         [(name, i, phone.value) for i, phone in enumerate(record.phones)])
+        conn.execute("DELETE FROM emails WHERE contact = ?", (name,))
+        conn.executemany("INSERT INTO emails (contact, position, value, value_lower) VALUES (?, ?, ?, ?)",
+                         [(name, i, email.value, email.key) for i, email in enumerate(record.emails)])
+
+    @staticmethod
+    def read(conn, name):
+        """Build a ContactRecord from its rows, None if there is no such contact"""
+        row = conn.execute("SELECT address, birthday, created_at, updated_at FROM contacts WHERE name = ?",
+                           (name,)).fetchone()
+        if row is None:
+            return None
+
+        address, birthday, created_at, updated_at = row
+        record = ContactRecord(name)
+        record.phones = [Phone(value) for (value,) in conn.execute(
+            "SELECT value FROM phones WHERE contact = ? ORDER BY position", (name,))]
+        record.emails = [Email(value) for (value,) in conn.execute(
+            "SELECT value FROM emails WHERE contact = ? ORDER BY position", (name,))]
+        record.address = Address(address) if address is not None else None
+        record.birthday = Birthday(birthday) if birthday is not None else None
+        record.created_at = datetime.fromisoformat(created_at)
+        record.updated_at = datetime.fromisoformat(updated_at)
+        return record
+
+class NoteTable:
+    """Maps NoteRecord objects to the notes and note_tags tables"""
+    table = "notes"
+    schema = NOTES_SCHEMA
+    key_columns = [("notes", "name_lower", "name"), ("note_tags", "tag_lower", "tag")]
+
+    @staticmethod
+    def write(conn, record):
+        """Insert or update a note with its tags"""
+        name = record.name.value
+        conn.execute(
+            """INSERT INTO notes (name, name_lower, content, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (name) DO UPDATE SET
+                   name_lower = excluded.name_lower, content = excluded.content,
+                   created_at = excluded.created_at, updated_at = excluded.updated_at""",
+            (name, record.name.key, record.content, record.created_at.isoformat(), record.updated_at.isoformat()))
+
+        conn.execute("DELETE FROM note_tags WHERE note = ?", (name,))
+        conn.executemany("INSERT INTO note_tags (note, position, tag, tag_lower) VALUES (?, ?, ?, ?)",
+                         [(name, i, tag.value, tag.key) for i, tag in enumerate(record.tags)])
+
+    @staticmethod
+    def read(conn, name):
+        """Build a NoteRecord from its rows, None if there is no such note"""
+        row = conn.execute("SELECT content, created_at, updated_at FROM notes WHERE name = ?",
+                           (name,)).fetchone()
+        if row is None:
+            return None
+
+        content, created_at, updated_at = row
+        record = NoteRecord(name, content)
+        record.tags = [Tag(value) for (value,) in conn.execute(
+            "SELECT tag FROM note_tags WHERE note = ? ORDER BY position", (name,))]
+        record.created_at = datetime.fromisoformat(created_at)
+        record.updated_at = datetime.fromisoformat(updated_at)
+        return record
+
+class SQLiteRecords(MutableMapping):
+    """
+    Dictionary-like view of the records stored in SQLite.
+    Records are read on first access and cached; writes go straight to the
+    database inside the current transaction, which SQLiteBackend.apply commits.
+    """
+    def __init__(self, conn, mapper, lock):
+        self.conn = conn
+        self.mapper = mapper
+        self.lock = lock
+        self.cache = {}
+
+    def __getitem__(self, key):
+        if key in self.cache:
+            return self.cache[key]
+        record = self.mapper.read(self.conn, key)
+        if record is None:
+            raise KeyError(key)
+        self.cache[key] = record
+        return record
+
+    def __setitem__(self, key, record):
+        # Held so that a commit from a flush thread never splits a record
+        with self.lock:
+            self.mapper.write(self.conn, record)
+            self.cache[key] = record
+
+    def __delitem__(self, key):
+        with self.lock:
+            cursor = self.conn.execute(f"DELETE FROM {self.mapper.table} WHERE name = ?", (key,))
+            self.cache.pop(key, None)
+        if not cursor.rowcount:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in self.cache:
+            return True
+        return self.conn.execute(f"SELECT 1 FROM {self.mapper.table} WHERE name = ?",
+                                 (key,)).fetchone() is not None
+
+    def __iter__(self):
+        names = self.conn.execute(f"SELECT name FROM {self.mapper.table} ORDER BY rowid").fetchall()
+        return (name for (name,) in names)
+
+    def __len__(self):
+        return self.conn.execute(f"SELECT COUNT(*) FROM {self.mapper.table}").fetchone()[0]
+
+class SQLiteBackend(StorageBackend):
+    """Stores records in normalized, indexed SQLite tables"""
+    mappers = {"contacts": ContactTable, "notes": NoteTable}
+
+    def __init__(self, filepath, kind):
+        if kind not in self.mappers:
+            raise ValueError(f"SQLite storage needs a record kind, one of: {', '.join(self.mappers)}")
+        self.filepath = filepath
+        self.mapper = self.mappers[kind]
+        # Write-behind storage commits from its idle-flush thread
+        self.conn = sqlite3.connect(filepath, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(self.mapper.schema)
+        self._refresh_keys()
+        self.lock = threading.RLock()
+        self.records = SQLiteRecords(self.conn, self.mapper, self.lock)
+
+    def _refresh_keys(self):
+        """Recompute stored search keys written by a release (or setting) that built them another way"""
+        if not self.mapper.key_columns:
+            return
+        self.conn.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self.conn.execute("SELECT value FROM settings WHERE name = 'key_mode'").fetchone()
+        if row is not None and row[0] == KEY_MODE:
+            return
+        self.conn.create_function("search_key", 1, search_key, deterministic=True)
+        for table, column, source in self.mapper.key_columns:
+            self.conn.execute(f"UPDATE {table} SET {column} = search_key({source})")
+        self.conn.execute("INSERT OR REPLACE INTO settings (name, value) VALUES ('key_mode', ?)", (KEY_MODE,))
+        self.conn.commit()
+
+    def load(self):
+        """Return a lazy mapping over the stored records"""
+        return self.records
+
+    def save(self, data):
+        """Replace every stored record with the contents of data"""
+        with self.lock:
+            try:
+                if data is not self.records:
+                    records = list(data.values())
+                    self.conn.execute(f"DELETE FROM {self.mapper.table}")
+                    self.records.cache.clear()
+                    for record in records:
+                        self.records[record.name.value] = record
+                self.conn.commit()
+                return True
+            except Exception as e:
+                self.conn.rollback()
+                print(f"Error saving data: {e}")
+                return False
+
+    def apply(self, changes, data):
+        """Commit the changes, which the record mapping has already written"""
+        if data is not self.records:
+            return self.save(data)
+        with self.lock:
+            try:
+                self.conn.commit()
+                return True
+            except Exception as e:
+                print(f"Error saving data: {e}")
+                return False
+
+    def detach(self, data, changes=None):
+        """
+        The record mapping writes through to the database as it is edited, so
+        it is handed over as is: the writer only commits. Other mappings are copied.
+        """
+        if data is self.records:
+            return data
+        return super().detach(data, changes)
+
+    def close(self):
+        """Commit pending writes and close the connection"""
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def search_contacts(self, query, phone_forms=()):
+        """Names of contacts whose name, phone, email or address contains query, or a phone one of phone_forms"""
+        if self.mapper is not ContactTable:
+            return None
+        params = {"q": search_key(query)}
+        # Phones are stored canonical, so a phone-like query is also looked for in its digit forms
+        phone_tests = ["instr(value, :q)"]
+        for number, form in enumerate(phone_forms):
+            params[f"p{number}"] = form
+            phone_tests.append(f"instr(value, :p{number})")
+        rows = self.conn.execute(
+            f"""SELECT name FROM contacts WHERE name IN (
+                   SELECT name FROM contacts WHERE instr(name_lower, :q) OR instr(address_lower, :q)
+                   UNION SELECT contact FROM phones WHERE {" OR ".join(phone_tests)}
+                   UNION SELECT contact FROM emails WHERE instr(value_lower, :q))
+               ORDER BY rowid""", params)
+        return [name for (name,) in rows]
+
+    def find_birthdays(self, start, days):
+        """Names of contacts with a birthday within days after the start date"""
+        if self.mapper is not ContactTable:
+            return None
+        if days >= 365:
+            rows = self.conn.execute("SELECT name FROM contacts WHERE birthday_md IS NOT NULL")
+            return [name for (name,) in rows]
+
+        end = start + timedelta(days=days)
+        ranges = [(start.strftime("%m-%d"), end.strftime("%m-%d"))]
+        if end.year != start.year:
+            # The window wraps over New Year
+            ranges = [(start.strftime("%m-%d"), "12-31"), ("01-01", end.strftime("%m-%d"))]
+        if ranges[-1][1] == "02-28" and not calendar.isleap(end.year):
+            # Feb 29 birthdays are celebrated on Feb 28 outside leap years
+            ranges[-1] = (ranges[-1][0], "02-29")
+
+        names = []
+        for low, high in ranges:
+            rows = self.conn.execute("SELECT name FROM contacts WHERE birthday_md BETWEEN ? AND ?", (low, high))
+            names.extend(name for (name,) in rows)
+        return names
+
+    def search_by_tag(self, tag):
+        """Names of notes tagged with tag (its search key, without #)"""
+        if self.mapper is not NoteTable:
+            return None
+        rows = self.conn.execute(
+            """SELECT name FROM notes WHERE name IN (SELECT note FROM note_tags WHERE tag_lower = ?)
+               ORDER BY rowid""", (tag,))
+        return [name for (name,) in rows]
@@ -1,36 +1,465 @@
-import pickle
+import atexit
+import copy
+import io
 import os
+import threading
+import time
+from src.migrations import migrate
+from src.utils import compression, record_codec
+from src.utils.background_writer import BackgroundWriter
+from src.utils.journal import Journal
+
+# Journal size (in bytes) after which it is folded back into the snapshot
+COMPACT_THRESHOLD = 1024 * 1024
+
+# Backend used by the address book and the note book ("pickle", "indexed", "sharded" or "sqlite")
+DEFAULT_BOOK_BACKEND = os.environ.get("ASSISTANT_STORAGE_BACKEND", "pickle")
+
+# How book records are serialized ("binary" or "pickle"); files in either format load
+DEFAULT_RECORD_FORMAT = os.environ.get("ASSISTANT_RECORD_FORMAT", "binary")
+
+# Compression codec of each book ("none", "zlib", "lzma" or "bz2"); files load whatever they use
+CONTACTS_COMPRESSION = os.environ.get("ASSISTANT_CONTACTS_COMPRESSION", "none")
+NOTES_COMPRESSION = os.environ.get("ASSISTANT_NOTES_COMPRESSION", "none")
+
+# Number of shard files a new sharded book is split into
+SHARD_COUNT = int(os.environ.get("ASSISTANT_SHARD_COUNT", "16"))
+
+# Whether the books are written by a background thread, so the prompt never waits for the disk
+BACKGROUND_WRITES = os.environ.get("ASSISTANT_BACKGROUND_WRITES", "0") == "1"
+
+# Writes the background thread may have queued before callers have to wait for it
+WRITE_QUEUE_SIZE = 8
+
+# Seconds without new changes after which write-behind storage flushes on its own
+FLUSH_DELAY = float(os.environ.get("ASSISTANT_FLUSH_DELAY", "2"))
+
+class StorageBackend:
+    """Base class for the on-disk formats used by Storage"""
+    # Schema version stamped on the data load() returned (see src.migrations). Stays None
+    # for backends that do not stamp one
+    loaded_schema = None
+
+    def load(self):
+        """Load the stored mapping, None if nothing is stored yet"""
+        raise NotImplementedError
+
+    def save(self, data):
+        """Replace everything stored with data"""
+        raise NotImplementedError
+
+    def apply(self, changes, data):
+        """Persist a change set ({key: record or None for deletion}) made to data"""
+        return self.save(data)
+
+    def close(self):
+        """Release files, connections and threads held by the backend"""
+        pass
+
+    def reads_data(self, changes):
+        """Whether writing the change set (None for a full save) reads the records of data"""
+        return True
+
+    def detach(self, data, changes=None):
+        """
+        Copy of data that another thread can write while the records keep
+        changing, for the given change set (None for a full save). None if the
+        write has to run on the thread that edits the records.
+        """
+        return {key: copy.deepcopy(record) for key, record in data.items()}
+
+    # Query push-down. A backend returns None when it cannot answer a query
+    # itself, and the caller falls back to scanning the records in memory.
+    def search_contacts(self, query, phone_forms=()):
+        """Names of contacts whose name, phone, email or address contains query, or a phone one of phone_forms"""
+        return None
+
+    def find_birthdays(self, start, days):
+        """Names of contacts with a birthday within days after the start date"""
+        return None
+
+    def search_by_tag(self, tag):
+        """Names of notes tagged with tag (its search key, without #)"""
+        return None
+
+class PickleBackend(StorageBackend):
+    """Stores a whole mapping as one pickle, optionally with a change journal"""
+
+    def __init__(self, filepath, journal=False, compact_threshold=COMPACT_THRESHOLD, record_format="pickle",
+                 codec="none", schema=None):
+        self.filepath = filepath
+        self.record_format = record_format
+        # Schema version stamped on saved books (None for data that is not a book)
+        self.schema = schema
+        compression.check_codec(codec)
+        self.codec = codec
+
+        # Journaled mode: mutations are appended to a log instead of rewriting the snapshot
+        self.lock = threading.RLock()
+        self.journal = Journal(self.filepath + ".journal", self.lock, record_format) if journal else None
+        self.compact_threshold = compact_threshold
+        self._compaction = None
+
+    def save(self, data):
+        """Save data to disk"""
+        # A compaction finishing after this save would overwrite it with older data
+        self.wait()
+        try:
+            with self.lock:
+                self._write_snapshot(data)
+                if self.journal:
+                    self.journal.clear()
+            return True
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+
+    def apply(self, changes, data):
+        """Append the change set to the journal, or rewrite the snapshot without one"""
+        if not self.journal:
+            return self.save(data)
+
+        try:
+            self.journal.append(changes)
+        except Exception as e:
+            print(f"Error saving data: {e}")
+            return False
+
+        # Without data (the journal grew while the write was queued), the next write compacts
+        if data is not None and self._compaction_due():
+            self.compact(data)
+        return True
+
+    def reads_data(self, changes):
+        """Journal appends only read the change set, unless the journal is due for compaction"""
+        return changes is None or not self.journal or self._compaction_due()
+
+    def _compaction_due(self):
+        return self.journal.size() > self.compact_threshold
+
+    def compact(self, data, background=True):
+        """Fold the journal into a fresh snapshot"""
+        if self._compaction and self._compaction.is_alive():
+            return
+
+        with self.lock:
+            # Encoded here: the records keep changing while the compaction thread writes
+            snapshot = self._snapshot(data)
+            offset = self.journal.size() if self.journal else 0
+
+        if not background:
+            self._compact(snapshot, offset)
+            return
+
+        self._compaction = threading.Thread(target=self._compact, args=(snapshot, offset),
+                                            name=f"compact-{os.path.basename(self.filepath)}")
+        self._compaction.start()
+
+    def wait(self):
+        """Wait for a running background compaction to finish"""
+        if self._compaction:
+            self._compaction.join()
+
+    def close(self):
+        """Wait for pending background work"""
+        self.wait()
+
+    def load(self):
+        """Load data from disk"""
+        data = None
+        if os.path.exists(self.filepath):
+            try:
+                with open(self.filepath, "rb") as file:
+                    data, self.loaded_schema = record_codec.read_versioned_book(
+                        io.BytesIO(compression.decompress(file.read())))
+            except Exception as e:
+                print(f"Error loading data: {e}")
+                return None
+
+        if self.journal and self.journal.size():
+            try:
+                replayed = {} if data is None else data
+                if self.journal.replay(replayed):
+                    data = replayed
+            except Exception as e:
+                print(f"Error loading data: {e}")
+
+        return data
+
+    def _snapshot(self, data):
+        """Bytes of the snapshot file holding data, which a background compaction can write while data changes"""
+        buffer = io.BytesIO()
+        record_codec.write_book(data, buffer, self.record_format, self.schema)
+        return compression.compress(buffer.getvalue(), self.codec)
+
+    def _compact(self, snapshot, offset):
+        """Write snapshot and drop the journal entries it already contains"""
+        try:
+            tmp_path = self._write_tmp(snapshot)
+            with self.lock:
+                os.replace(tmp_path, self.filepath)
+                if self.journal:
+                    self.journal.discard(offset)
+        except Exception as e:
+            print(f"Error compacting data: {e}")
+
+    def _write_snapshot(self, data):
+        """Atomically replace the snapshot file with data"""
+        os.replace(self._write_tmp(self._snapshot(data)), self.filepath)
+
+    def _write_tmp(self, snapshot):
+        """Write an encoded snapshot next to the snapshot file, returns the temporary path"""
+        tmp_path = f"{self.filepath}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(snapshot)
+            file.flush()
+            os.fsync(file.fileno())
+        return tmp_path
 
 class Storage:
     """Class for saving and loading data from disk"""
-    def __init__(self, filename):
+    def __init__(self, filename, journal=False, compact_threshold=COMPACT_THRESHOLD,
+                 backend="pickle", kind=None, write_behind=False, flush_delay=FLUSH_DELAY,
+                 shards=SHARD_COUNT, record_format="pickle", codec="none", background=False,
+                 schema=None):
         self.filename = filename
+        self.kind = kind
         self.data_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
-        
+
         # Create data folder if it doesn't exist
         if not os.path.exists(self.data_folder):
             os.makedirs(self.data_folder)
-        
+
         self.filepath = os.path.join(self.data_folder, filename)
-    
+
+        if backend == "pickle":
+            self.backend = PickleBackend(self.filepath, journal, compact_threshold, record_format, codec, schema)
+        elif backend == "sqlite":
+            # Imported here: the SQLite backend depends on the record classes
+            from src.utils.sqlite_storage import SQLiteBackend
+            self.backend = SQLiteBackend(os.path.splitext(self.filepath)[0] + ".sqlite3", kind)
+        elif backend == "indexed":
+            from src.utils.indexed_storage import IndexedBackend
+            self.backend = IndexedBackend(os.path.splitext(self.filepath)[0] + ".idx", journal, compact_threshold,
+                                          record_format, schema)
+        elif backend == "sharded":
+            from src.utils.sharded_storage import ShardedBackend
+            self.backend = ShardedBackend(os.path.splitext(self.filepath)[0] + ".shards", shards, record_format,
+                                          codec)
+        else:
+            raise ValueError(f"Unknown storage backend: {backend}")
+
+        # Write-behind mode: change sets are coalesced in memory and handed to the
+        # backend by flush(), on an idle timer, or at interpreter exit
+        self.write_behind = write_behind
+        self.flush_delay = flush_delay
+        self.lock = threading.RLock()
+        self.pending = {}
+        self.pending_data = None
+        self._last_change = 0
+        self._timer = None
+
+        # Background mode: writes run on a writer thread. Changes it failed to write
+        # wait in failed (under their own lock) until the next flush picks them up
+        self.writer = BackgroundWriter(f"writer-{filename}", WRITE_QUEUE_SIZE) if background else None
+        self.failed_lock = threading.Lock()
+        self.failed = {}
+        self.failed_data = None
+        self.last_latency = None
+        if write_behind or background:
+            atexit.register(self.drain)
+
     def save(self, data):
         """Save data to disk"""
-        try:
-            with open(self.filepath, "wb") as file:
-                pickle.dump(data, file)
-            return True
-        except Exception as e:
-            print(f"Error saving data: {e}")
-            return False
-    
+        with self.lock:
+            # A full save covers every pending change
+            self.pending = {}
+            self.pending_data = None
+            with self.failed_lock:
+                self.failed = {}
+                self.failed_data = None
+            return self._persist(None, data)
+
+    def apply(self, changes, data):
+        """Persist a change set ({key: record or None for deletion}) made to data"""
+        if not self.write_behind:
+            with self.lock:
+                return self._persist(changes, data)
+
+        with self.lock:
+            self.pending.update(changes)
+            self.pending_data = data
+            self._last_change = time.monotonic()
+            if self.flush_delay and self._timer is None:
+                self._start_timer(self.flush_delay)
+        return True
+
+    def set_flush_delay(self, delay):
+        """Change how long pending changes wait for more before they are flushed (0: only on flush())"""
+        with self.lock:
+            self.flush_delay = delay
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if delay and self.pending:
+                self._start_timer(delay)
+
+    def flush(self):
+        """Hand pending changes to the backend"""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            # Retry failed changes, unless newer ones replaced them
+            with self.failed_lock:
+                for key, record in self.failed.items():
+                    self.pending.setdefault(key, record)
+                # Not a truth test: sizing a lazy or SQLite mapping is not free
+                if self.pending_data is None:
+                    self.pending_data = self.failed_data
+                self.failed = {}
+                self.failed_data = None
+            if not self.pending:
+                return True
+
+            changes, data = self.pending, self.pending_data
+            self.pending = {}
+            self.pending_data = None
+            return self._persist(changes, data)
+
+    def drain(self):
+        """Flush and wait until everything has reached the backend, returns the errors hit on the way"""
+        if self.writer is None:
+            return [] if self.flush() else [f"{self.filename}: write failed"]
+        self.flush()
+        return self.writer.drain()
+
+    def status(self):
+        """
+        Changes not written yet, writes queued for the writer thread, the last
+        write time in seconds and the number of shards (None unless sharded)
+        """
+        with self.failed_lock:
+            failed = len(self.failed)
+        return {
+            "pending_changes": len(self.pending) + failed,
+            "queued_writes": self.writer.pending() if self.writer else 0,
+            "last_latency": self.last_latency,
+            "shards": self.backend.manifest["shards"] if hasattr(self.backend, "reshard") else None,
+        }
+
+    def reshard(self, count, data):
+        """Redistribute data over count shard files"""
+        if not hasattr(self.backend, "reshard"):
+            raise ValueError("Storage backend is not sharded")
+        with self.lock:
+            # Queued writes would land in the old shard layout
+            if self.writer:
+                self.writer.wait()
+            written = self.backend.reshard(count, data)
+            # The new layout holds every pending change; a failed one still needs them
+            if written:
+                self.pending = {}
+                self.pending_data = None
+            return written
+
+    def is_dirty(self):
+        """Whether there are changes not handed to the backend yet"""
+        return bool(self.pending or self.failed)
+
     def load(self):
         """Load data from disk"""
-        if not os.path.exists(self.filepath):
-            return None
-        
+        data = self.backend.load()
+
+        # First start on a new backend: bring over what the pickle files hold (the
+        # indexed backend subclasses PickleBackend, but keeps its own files)
+        legacy_files = [self.filepath, self.filepath + ".journal"]
+        if not data and type(self.backend) is not PickleBackend and any(map(os.path.exists, legacy_files)):
+            legacy_backend = PickleBackend(self.filepath, journal=True)
+            legacy = legacy_backend.load()
+            legacy_backend.close()
+            if legacy:
+                # The new backend can only hold current records
+                if self.kind and legacy_backend.loaded_schema is not None:
+                    migrate(legacy, self.kind, legacy_backend.loaded_schema)
+                if self.backend.save(legacy):
+                    self._retire(legacy_files)
+                data = self.backend.load()
+        return data
+
+    def _retire(self, legacy_files):
+        """Rename imported pickle files, so a store emptied later does not import them again"""
+        for path in legacy_files:
+            try:
+                if os.path.exists(path):
+                    os.replace(path, path + ".migrated")
+            except OSError as e:
+                print(f"Error renaming {path}: {e}")
+
+    def close(self):
+        """Flush, stop the writer thread and release the backend, returns write errors"""
+        errors = self.drain()
+        if self.writer:
+            self.writer.stop()
+        self.backend.close()
+        return errors
+
+    def _persist(self, changes, data):
+        """Write a change set (None for a full save), on the writer thread if there is one"""
+        if self.writer is None:
+            return self._write(changes, data)
+
+        detached = None
+        if self.backend.reads_data(changes):
+            detached = self.backend.detach(data, changes)
+            if detached is None:
+                # Writes that cannot be detached run here, after the queued ones, so no edit lands mid-write
+                self.writer.wait()
+                return self._write(changes, data)
+
+        if changes is not None:
+            # The records may be edited again before the writer gets to them
+            changes = {key: copy.deepcopy(record) for key, record in changes.items()}
+        self.writer.submit(self._write, changes, detached, data)
+        return True
+
+    def _write(self, changes, data, source=None):
+        """
+        Hand a change set (None for a full save) to the backend, keeping failed
+        changes. source is the mapping data was detached from, which a retry writes.
+        """
+        started = time.perf_counter()
         try:
-            with open(self.filepath, "rb") as file:
-                return pickle.load(file)
-        except Exception as e:
-            print(f"Error loading data: {e}")
-            return None
\ No newline at end of file
+            if changes is None:
+                written = self.backend.save(data)
+            else:
+                written = self.backend.apply(changes, data)
+        finally:
+            self.last_latency = time.perf_counter() - started
+
+        if not written and changes:
+            with self.failed_lock:
+                # Changes from later writes are newer than the ones that failed before
+                self.failed.update(changes)
+                self.failed_data = data if source is None else source
+        return written
+
+    def _start_timer(self, delay):
+        """Schedule an idle check"""
+        self._timer = threading.Timer(delay, self._flush_if_idle)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_if_idle(self):
+        """Flush once no change has arrived for flush_delay seconds"""
+        with self.lock:
+            self._timer = None
+            # The delay was turned off while this check waited for the lock
+            if not self.flush_delay:
+                return
+            idle = time.monotonic() - self._last_change
+            if idle < self.flush_delay:
+                self._start_timer(self.flush_delay - idle)
+                return
+        self.flush()
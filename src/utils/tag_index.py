@@ -0,0 +1,68 @@
+from bisect import bisect_left, insort
+from src.utils.normalization import search_key
+
+class TagIndex:
+    """
+    Tags of documents and the documents under each tag, both ways. Looking up
+    a tag is one dict access, and the tags are kept sorted so the grouped view
+    is read off instead of rebuilt. Tags are compared by their search keys and
+    grouped under the first spelling seen in lower case; keys of documents
+    without tags are kept apart.
+    """
+    def __init__(self):
+        # tag -> keys under it (a dict keeps them in insertion order)
+        self.tags = {}
+        # Sorted tags
+        self.order = []
+        # tag -> how it is shown in groups
+        self.labels = {}
+        # key -> its tags
+        self.items = {}
+        self.untagged = {}
+
+    def add(self, key, tags):
+        """Index a document under tags, replacing what it was indexed under before"""
+        self.remove(key)
+        labels = {}
+        for tag in tags:
+            labels.setdefault(search_key(tag), tag.lower())
+        tags = tuple(labels)
+        for tag in tags:
+            keys = self.tags.get(tag)
+            if keys is None:
+                keys = self.tags[tag] = {}
+                self.labels[tag] = labels[tag]
+                insort(self.order, tag)
+            keys[key] = None
+        if not tags:
+            self.untagged[key] = None
+        self.items[key] = tags
+
+    def remove(self, key):
+        """Drop a document from the index"""
+        tags = self.items.pop(key, None)
+        if tags is None:
+            return
+        for tag in tags:
+            keys = self.tags[tag]
+            del keys[key]
+            if not keys:
+                del self.tags[tag]
+                del self.labels[tag]
+                del self.order[bisect_left(self.order, tag)]
+        self.untagged.pop(key, None)
+
+    def find(self, tag):
+        """Keys of the documents with tag"""
+        return list(self.tags.get(search_key(tag), ()))
+
+    def groups(self):
+        """(tag, keys) for every tag in sorted order"""
+        return [(self.labels[tag], list(self.tags[tag])) for tag in self.order]
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def keys(self):
+        """Keys of the indexed documents"""
+        return self.items.keys()
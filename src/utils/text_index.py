@@ -0,0 +1,162 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from src.utils.normalization import search_key
+
+# Letters and digits of any script, so Ukrainian words are tokens as well (transliterated by search_key)
+TOKEN = re.compile(r"\w+")
+PHRASE = re.compile(r'"([^"]*)"')
+
+def tokenize(text):
+    """Words of the search key of text"""
+    return TOKEN.findall(search_key(text))
+
+class TextIndex:
+    """
+    Positional inverted index over the words of documents, ranked with BM25.
+    Plain query words match words starting with them, quoted phrases must occur
+    word for word; a document has to match all of them. Documents are keyed by
+    a string and updated one at a time.
+    """
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        # word -> {key: positions of the word in the document}
+        self.postings = {}
+        # key -> (number of words, distinct words) of the document
+        self.documents = {}
+        self.total_length = 0
+        # Sorted distinct words, for prefix matches
+        self.vocabulary = []
+
+    def add(self, key, texts):
+        """Index the texts of a document, replacing what was indexed under key before"""
+        self.remove(key)
+        positions = {}
+        position = 0
+        for text in texts:
+            for word in tokenize(text):
+                positions.setdefault(word, []).append(position)
+                position += 1
+            # A gap keeps phrases from running from one text into the next
+            position += 1
+
+        length = sum(len(found) for found in positions.values())
+        for word, found in positions.items():
+            posting = self.postings.get(word)
+            if posting is None:
+                posting = self.postings[word] = {}
+                insort(self.vocabulary, word)
+            posting[key] = found
+        self.documents[key] = (length, tuple(positions))
+        self.total_length += length
+
+    def remove(self, key):
+        """Drop a document from the index"""
+        entry = self.documents.pop(key, None)
+        if entry is None:
+            return
+        length, words = entry
+        self.total_length -= length
+        for word in words:
+            posting = self.postings[word]
+            del posting[key]
+            if not posting:
+                del self.postings[word]
+                del self.vocabulary[bisect_left(self.vocabulary, word)]
+
+    def search(self, query, limit=None):
+        """(key, score) of the documents matching query, best first; at most limit of them"""
+        phrases = [tokenize(phrase) for phrase in PHRASE.findall(query)]
+        phrases = [phrase for phrase in phrases if phrase]
+        words = tokenize(PHRASE.sub(" ", query))
+        if not phrases and not words:
+            return []
+
+        # Every query word and phrase narrows the candidates; the scored words are collected on the way
+        candidates = None
+        scored = set()
+        for word in words:
+            expansions = self._expand(word)
+            matching = set()
+            for expansion in expansions:
+                matching.update(self.postings[expansion])
+            scored.update(expansions)
+            candidates = matching if candidates is None else candidates & matching
+            if not candidates:
+                return []
+        for phrase in phrases:
+            matching = self._phrase(phrase)
+            scored.update(phrase)
+            candidates = matching if candidates is None else candidates & matching
+            if not candidates:
+                return []
+
+        scores = self._scores(candidates, scored)
+        # Highest score first, equal scores by key
+        order = lambda pair: (-pair[1], pair[0])
+        if limit is None:
+            return sorted(scores.items(), key=order)
+        return heapq.nsmallest(limit, scores.items(), key=order)
+
+    def _expand(self, prefix):
+        """Indexed words starting with prefix"""
+        vocabulary = self.vocabulary
+        words = []
+        for position in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+            if not vocabulary[position].startswith(prefix):
+                break
+            words.append(vocabulary[position])
+        return words
+
+    def _phrase(self, phrase):
+        """Keys of the documents holding the words of phrase one after another"""
+        postings = [self.postings.get(word) for word in phrase]
+        if not all(postings):
+            return set()
+        keys = set.intersection(*(set(posting) for posting in postings))
+        result = set()
+        for key in keys:
+            starts = set(postings[0][key])
+            for offset, posting in enumerate(postings[1:], 1):
+                starts &= {position - offset for position in posting[key]}
+                if not starts:
+                    break
+            if starts:
+                result.add(key)
+        return result
+
+    def _scores(self, keys, words):
+        """BM25 score of every key over words"""
+        count = len(self.documents)
+        average = self.total_length / count if count else 0
+        scores = dict.fromkeys(keys, 0.0)
+        for word in words:
+            posting = self.postings.get(word)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key in keys & posting.keys():
+                frequency = len(posting[key])
+                length = self.documents[key][0]
+                norm = self.k1 * (1 - self.b + self.b * length / average) if average else self.k1
+                scores[key] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return scores
+
+    def __contains__(self, key):
+        return key in self.documents
+
+    def __len__(self):
+        return len(self.documents)
+
+    def keys(self):
+        """Keys of the indexed documents"""
+        return self.documents.keys()
+
+def matches(texts, query):
+    """Whether the texts of one document match query as the index would match them"""
+    index = TextIndex()
+    index.add("", texts)
+    return bool(index.search(query))
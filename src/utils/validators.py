@@ -13,6 +13,18 @@ def validate_phone(phone):
         return True
     return False
 
+def normalize_phone(phone):
+    """
+    Canonical digits form of a phone number (or of a part of one).
+    Separators and the leading + are dropped, and national numbers starting
+    with 0 get the 38 country prefix: 0501234567 and +380 50 123 45 67 both
+    become 380501234567.
+    """
+    digits = re.sub(r'[\s\-\(\)\+]', '', phone)
+    if digits.startswith('0'):
+        digits = '38' + digits
+    return digits
+
 def validate_email(email):
     """
     Validates email format using a regular expression.